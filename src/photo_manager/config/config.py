@@ -8,6 +8,14 @@ from typing import Any
 
 import yaml
 
+try:
+    # libyaml-backed implementations, much faster when available
+    from yaml import CSafeDumper as _SafeDumper
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeDumper as _SafeDumper
+    from yaml import SafeLoader as _SafeLoader
+
 
 DEFAULT_CONFIG: dict[str, Any] = {
     "database": {
@@ -71,6 +79,26 @@ DEFAULT_CONFIG: dict[str, Any] = {
 }
 
 
+# Parsed YAML keyed by path; entries are reused while (mtime, size) match
+_yaml_cache: dict[Path, tuple[int, int, dict[str, Any]]] = {}
+
+
+def _parse_yaml(path: Path) -> dict[str, Any]:
+    """Parse a YAML config file, reusing the last parse if it is unchanged.
+
+    The returned dict is shared with the cache and must not be mutated.
+    """
+    key = path.resolve()
+    stat = key.stat()
+    cached = _yaml_cache.get(key)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+    with open(key, "r", encoding="utf-8") as f:
+        data = yaml.load(f, Loader=_SafeLoader) or {}
+    _yaml_cache[key] = (stat.st_mtime_ns, stat.st_size, data)
+    return data
+
+
 def _deep_merge(base: dict, override: dict) -> dict:
     """Recursively merge override into base, returning a new dict."""
     result = copy.deepcopy(base)
@@ -105,9 +133,7 @@ class ConfigManager:
         if path is None:
             raise ValueError("No config path specified")
         self._path = path
-        with open(path, "r", encoding="utf-8") as f:
-            user_config = yaml.safe_load(f) or {}
-        self._config = _deep_merge(DEFAULT_CONFIG, user_config)
+        self._config = _deep_merge(DEFAULT_CONFIG, _parse_yaml(path))
 
     def save(self, config_path: str | Path | None = None) -> None:
         """Save current config to YAML file."""
@@ -117,7 +143,10 @@ class ConfigManager:
         self._path = path
         path.parent.mkdir(parents=True, exist_ok=True)
         with open(path, "w", encoding="utf-8") as f:
-            yaml.dump(self._config, f, default_flow_style=False, sort_keys=False)
+            yaml.dump(
+                self._config, f, Dumper=_SafeDumper,
+                default_flow_style=False, sort_keys=False,
+            )
 
     def get(self, dotted_key: str, default: Any = None) -> Any:
         """Get a config value using dotted notation (e.g. 'ui.default_zoom')."""
@@ -143,3 +172,8 @@ class ConfigManager:
     def reset(self) -> None:
         """Reset config to defaults."""
         self._config = copy.deepcopy(DEFAULT_CONFIG)
+
+    @staticmethod
+    def clear_cache() -> None:
+        """Forget previously parsed config files."""
+        _yaml_cache.clear()
@@ -4,14 +4,16 @@ from __future__ import annotations
 
 import sqlite3
 from contextlib import contextmanager
+from dataclasses import replace
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Generator
+from typing import Any, Generator, Iterable, Iterator
 
 from photo_manager.db.models import (
     DuplicateGroup,
     DuplicateGroupMember,
     ImageRecord,
+    ImageRecordArray,
     ImageTag,
     TagDefinition,
 )
@@ -19,8 +21,29 @@ from photo_manager.db.schema import (
     CURRENT_SCHEMA_VERSION,
     DEFAULT_TAG_TREE,
     SCHEMA_V1,
+    SCHEMA_V2,
+    SCHEMA_V3,
 )
 
+# Pass as db_path to create_database() for a throwaway in-memory database
+MEMORY_DATABASE = ":memory:"
+
+_INSERT_IMAGE_SQL = """INSERT INTO images (
+    filepath, filename, file_size, width, height,
+    datetime, year, month, day, hour, minute, second,
+    latitude, longitude, has_lat_lon, city, town, state,
+    phash_0, phash_90, dhash_0, dhash_90,
+    favorite, to_delete, reviewed, auto_tag_errors,
+    date_added, date_modified
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+
+# Rows fetched per round trip by the streaming readers
+FETCH_BATCH_SIZE = 10_000
+
+# Bound parameters per statement; SQLite builds before 3.32 cap this at 999
+MAX_SQL_PARAMS = 999
+
 
 class DatabaseManager:
     """Manages SQLite database for photo metadata and tags."""
@@ -28,6 +51,13 @@ class DatabaseManager:
     def __init__(self, db_path: str | Path | None = None):
         self._db_path = Path(db_path) if db_path else None
         self._conn: sqlite3.Connection | None = None
+        # Lazily loaded tag definition caches; None when stale
+        self._tag_defs: dict[int, TagDefinition] | None = None
+        self._tag_children: dict[int | None, list[TagDefinition]] | None = None
+        self._tag_paths: dict[str, int] | None = None
+        self._tag_id_paths: dict[int, str] | None = None
+        # Bumped whenever the caches above are dropped
+        self._tag_generation = 0
 
     @property
     def db_path(self) -> Path | None:
@@ -37,14 +67,27 @@ class DatabaseManager:
     def is_open(self) -> bool:
         return self._conn is not None
 
+    @property
+    def tag_generation(self) -> int:
+        """Counter that changes whenever tag definitions may have changed."""
+        return self._tag_generation
+
     def create_database(self, db_path: str | Path) -> None:
-        """Create a new database with schema and default tag tree."""
-        self._db_path = Path(db_path)
-        self._db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._conn = sqlite3.connect(str(self._db_path))
-        self._conn.execute("PRAGMA journal_mode=WAL")
-        self._conn.execute("PRAGMA foreign_keys=ON")
+        """Create a new database with schema and default tag tree.
+
+        If db_path is MEMORY_DATABASE the database lives only in memory
+        and db_path stays None.
+        """
+        if str(db_path) == MEMORY_DATABASE:
+            self._db_path = None
+            self._conn = self._connect(MEMORY_DATABASE)
+        else:
+            self._db_path = Path(db_path)
+            self._db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = self._connect(str(self._db_path))
         self._conn.executescript(SCHEMA_V1)
+        self._conn.executescript(SCHEMA_V2)
+        self._conn.executescript(SCHEMA_V3)
         now = datetime.now(timezone.utc).isoformat()
         self._conn.execute(
             "INSERT INTO schema_version (version, applied_date) VALUES (?, ?)",
@@ -58,9 +101,7 @@ class DatabaseManager:
         self._db_path = Path(db_path)
         if not self._db_path.exists():
             raise FileNotFoundError(f"Database not found: {self._db_path}")
-        self._conn = sqlite3.connect(str(self._db_path))
-        self._conn.execute("PRAGMA journal_mode=WAL")
-        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn = self._connect(str(self._db_path))
         version = self._get_schema_version()
         if version < CURRENT_SCHEMA_VERSION:
             self._apply_migrations(version)
@@ -68,8 +109,11 @@ class DatabaseManager:
     def close(self) -> None:
         """Close the database connection."""
         if self._conn:
+            # Refresh planner statistics for tables whose shape changed
+            self._conn.execute("PRAGMA optimize")
             self._conn.close()
             self._conn = None
+        self.invalidate_caches()
 
     @contextmanager
     def transaction(self) -> Generator[None, None, None]:
@@ -89,30 +133,16 @@ class DatabaseManager:
         self._ensure_open()
         now = datetime.now(timezone.utc).isoformat()
         cursor = self._conn.execute(
-            """INSERT INTO images (
-                filepath, filename, file_size, width, height,
-                datetime, year, month, day, hour, minute, second,
-                latitude, longitude, has_lat_lon, city, town, state,
-                phash_0, phash_90, dhash_0, dhash_90,
-                favorite, to_delete, reviewed, auto_tag_errors,
-                date_added, date_modified
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (
-                image.filepath, image.filename, image.file_size,
-                image.width, image.height,
-                image.datetime_str, image.year, image.month, image.day,
-                image.hour, image.minute, image.second,
-                image.latitude, image.longitude, int(image.has_lat_lon),
-                image.city, image.town, image.state,
-                image.phash_0, image.phash_90, image.dhash_0, image.dhash_90,
-                int(image.favorite), int(image.to_delete),
-                int(image.reviewed), int(image.auto_tag_errors),
-                now, now,
-            ),
+            _INSERT_IMAGE_SQL, self._image_insert_params(image, now)
         )
         self._conn.commit()
         return cursor.lastrowid
 
+    def add_images_bulk(self, images: list[ImageRecord]) -> list[int]:
+        """Add many images in a single transaction. Returns the new IDs in order."""
+        with self.transaction():
+            return self._insert_images(images)
+
     def get_image(self, image_id: int) -> ImageRecord | None:
         """Get an image by ID."""
         self._ensure_open()
@@ -143,6 +173,35 @@ class DatabaseManager:
         ).fetchall()
         return [self._row_to_image(row) for row in rows]
 
+    def iter_image_hashes(
+        self, batch_size: int = FETCH_BATCH_SIZE
+    ) -> Iterator[list[tuple]]:
+        """Stream the hash columns of images that have hashes computed.
+
+        Yields lists of up to batch_size
+        (id, file_size, phash_0, phash_90, dhash_0, dhash_90) tuples,
+        ordered by filepath, without building full ImageRecords.
+        """
+        self._ensure_open()
+        cursor = self._conn.execute(
+            """SELECT id, file_size, phash_0, phash_90, dhash_0, dhash_90
+            FROM images
+            WHERE phash_0 IS NOT NULL AND dhash_0 IS NOT NULL
+            ORDER BY filepath"""
+        )
+        while rows := cursor.fetchmany(batch_size):
+            yield rows
+
+    def get_image_hash_array(self) -> ImageRecordArray:
+        """Get ids, file sizes and hashes of all hashed images as arrays.
+
+        Rows are ordered by filepath and packed one fetched batch at a time.
+        """
+        return ImageRecordArray.concatenate(
+            ImageRecordArray.from_hash_rows(batch)
+            for batch in self.iter_image_hashes()
+        )
+
     def update_image(self, image: ImageRecord) -> None:
         """Update an existing image record."""
         self._ensure_open()
@@ -197,54 +256,32 @@ class DatabaseManager:
              int(tag_def.is_category)),
         )
         self._conn.commit()
+        self.invalidate_caches()
         return cursor.lastrowid
 
     def get_tag_definition(self, tag_id: int) -> TagDefinition | None:
         """Get a tag definition by ID."""
-        self._ensure_open()
-        row = self._conn.execute(
-            "SELECT * FROM tag_definitions WHERE id = ?", (tag_id,)
-        ).fetchone()
-        return self._row_to_tag_def(row) if row else None
+        tag = self._get_tag_defs().get(tag_id)
+        return replace(tag) if tag else None
 
     def get_tag_definition_by_name(
         self, name: str, parent_id: int | None = None
     ) -> TagDefinition | None:
         """Get a tag definition by name and optional parent."""
-        self._ensure_open()
-        if parent_id is None:
-            row = self._conn.execute(
-                "SELECT * FROM tag_definitions WHERE name = ? AND parent_id IS NULL",
-                (name,),
-            ).fetchone()
-        else:
-            row = self._conn.execute(
-                "SELECT * FROM tag_definitions WHERE name = ? AND parent_id = ?",
-                (name, parent_id),
-            ).fetchone()
-        return self._row_to_tag_def(row) if row else None
+        self._get_tag_defs()
+        for tag in self._tag_children.get(parent_id, ()):
+            if tag.name == name:
+                return replace(tag)
+        return None
 
     def get_all_tag_definitions(self) -> list[TagDefinition]:
         """Get all tag definitions."""
-        self._ensure_open()
-        rows = self._conn.execute(
-            "SELECT * FROM tag_definitions ORDER BY id"
-        ).fetchall()
-        return [self._row_to_tag_def(row) for row in rows]
+        return [replace(tag) for tag in self._get_tag_defs().values()]
 
     def get_tag_children(self, parent_id: int | None = None) -> list[TagDefinition]:
         """Get child tag definitions of a parent (None for root tags)."""
-        self._ensure_open()
-        if parent_id is None:
-            rows = self._conn.execute(
-                "SELECT * FROM tag_definitions WHERE parent_id IS NULL ORDER BY name"
-            ).fetchall()
-        else:
-            rows = self._conn.execute(
-                "SELECT * FROM tag_definitions WHERE parent_id = ? ORDER BY name",
-                (parent_id,),
-            ).fetchall()
-        return [self._row_to_tag_def(row) for row in rows]
+        self._get_tag_defs()
+        return [replace(tag) for tag in self._tag_children.get(parent_id, ())]
 
     def get_tag_tree(self) -> list[dict]:
         """Get the full tag tree as nested dicts.
@@ -270,15 +307,72 @@ class DatabaseManager:
 
     def resolve_tag_path(self, dotted_path: str) -> TagDefinition | None:
         """Resolve a dotted tag path like 'event.birthday.Alice' to a TagDefinition."""
-        parts = dotted_path.split(".")
-        parent_id = None
-        tag_def = None
-        for part in parts:
-            tag_def = self.get_tag_definition_by_name(part, parent_id)
-            if tag_def is None:
-                return None
-            parent_id = tag_def.id
-        return tag_def
+        tag_id = self._get_tag_paths().get(dotted_path)
+        return self.get_tag_definition(tag_id) if tag_id is not None else None
+
+    def find_tag_ids(self, dotted_path: str) -> list[int]:
+        """IDs of tags whose path is dotted_path or ends in '.' + dotted_path.
+
+        This is how queries name tags: 'birthday' and 'event.birthday' both
+        match the tag 'event.birthday'.
+        """
+        self._get_tag_paths()
+        suffix = "." + dotted_path
+        return [
+            tag_id for tag_id, path in self._tag_id_paths.items()
+            if path == dotted_path or path.endswith(suffix)
+        ]
+
+    def get_tag_path(self, tag_id: int) -> str | None:
+        """Get the dotted path of a tag, e.g. 'event.birthday.Alice'."""
+        self._get_tag_paths()
+        return self._tag_id_paths.get(tag_id)
+
+    def invalidate_caches(self) -> None:
+        """Drop cached tag definitions, e.g. after editing tags directly via SQL."""
+        self._tag_defs = None
+        self._tag_children = None
+        self._tag_paths = None
+        self._tag_id_paths = None
+        self._tag_generation += 1
+
+    def _get_tag_defs(self) -> dict[int, TagDefinition]:
+        """Return all tag definitions by ID, loading them if stale.
+
+        Also builds the parent -> children index (ordered by name). Callers
+        must hand out copies so the cached instances are never mutated.
+        """
+        self._ensure_open()
+        if self._tag_defs is None:
+            rows = self._conn.execute(
+                "SELECT * FROM tag_definitions ORDER BY id"
+            ).fetchall()
+            self._tag_defs = {row[0]: self._row_to_tag_def(row) for row in rows}
+            children: dict[int | None, list[TagDefinition]] = {}
+            for tag in sorted(self._tag_defs.values(), key=lambda t: t.name):
+                children.setdefault(tag.parent_id, []).append(tag)
+            self._tag_children = children
+        return self._tag_defs
+
+    def _get_tag_paths(self) -> dict[str, int]:
+        """Return the dotted path -> tag ID index, building it if stale."""
+        self._ensure_open()
+        if self._tag_paths is None:
+            rows = self._conn.execute(
+                """WITH RECURSIVE paths(id, path) AS (
+                    SELECT id, name FROM tag_definitions WHERE parent_id IS NULL
+                    UNION ALL
+                    SELECT t.id, p.path || '.' || t.name
+                    FROM tag_definitions t JOIN paths p ON t.parent_id = p.id
+                )
+                SELECT id, path FROM paths ORDER BY id"""
+            ).fetchall()
+            index: dict[str, int] = {}
+            for tag_id, path in rows:
+                index.setdefault(path, tag_id)
+            self._tag_paths = index
+            self._tag_id_paths = dict(rows)
+        return self._tag_paths
 
     # --- Image Tag CRUD ---
 
@@ -295,6 +389,17 @@ class DatabaseManager:
         self._conn.commit()
         return cursor.lastrowid
 
+    def set_image_tags_bulk(
+        self, tags: Iterable[tuple[int, int, str | None]]
+    ) -> None:
+        """Set many (image_id, tag_id, value) tags in a single transaction."""
+        with self.transaction():
+            self._conn.executemany(
+                """INSERT OR IGNORE INTO image_tags (image_id, tag_id, value)
+                VALUES (?, ?, ?)""",
+                tags,
+            )
+
     def remove_image_tag(
         self, image_id: int, tag_id: int, value: str | None = None
     ) -> None:
@@ -349,20 +454,26 @@ class DatabaseManager:
     def create_duplicate_group(self, image_ids: list[int]) -> int:
         """Create a duplicate group with the given image IDs. Returns group ID."""
         self._ensure_open()
-        now = datetime.now(timezone.utc).isoformat()
-        cursor = self._conn.execute(
-            "INSERT INTO duplicate_groups (created_date) VALUES (?)", (now,)
-        )
-        group_id = cursor.lastrowid
-        for image_id in image_ids:
-            self._conn.execute(
-                """INSERT INTO duplicate_group_members (group_id, image_id)
-                VALUES (?, ?)""",
-                (group_id, image_id),
-            )
+        group_id = self._insert_duplicate_group(image_ids)
         self._conn.commit()
         return group_id
 
+    def create_duplicate_groups(self, groups: list[list[int]]) -> list[int]:
+        """Create several duplicate groups in one transaction. Returns group IDs."""
+        with self.transaction():
+            return [self._insert_duplicate_group(image_ids) for image_ids in groups]
+
+    def create_duplicate_group_with_images(
+        self, images: list[ImageRecord]
+    ) -> tuple[int, list[int]]:
+        """Add images and group them as duplicates in one transaction.
+
+        Returns (group ID, new image IDs in order).
+        """
+        with self.transaction():
+            image_ids = self._insert_images(images)
+            return self._insert_duplicate_group(image_ids), image_ids
+
     def get_duplicate_groups(self) -> list[DuplicateGroup]:
         """Get all duplicate groups with their members."""
         self._ensure_open()
@@ -418,6 +529,35 @@ class DatabaseManager:
         )
         self._conn.commit()
 
+    # --- Hash cache ---
+
+    def get_cached_hashes(
+        self, key: tuple[int, int, int, int]
+    ) -> tuple[str, str, str, str] | None:
+        """Get cached (phash_0, phash_90, dhash_0, dhash_90) for a file.
+
+        key is the file's (device, inode, mtime_ns, size).
+        """
+        self._ensure_open()
+        return self._conn.execute(
+            """SELECT phash_0, phash_90, dhash_0, dhash_90 FROM hash_cache
+            WHERE dev = ? AND ino = ? AND mtime_ns = ? AND size = ?""",
+            key,
+        ).fetchone()
+
+    def store_cached_hashes(
+        self,
+        entries: list[tuple[tuple[int, int, int, int], tuple[str, str, str, str]]],
+    ) -> None:
+        """Cache hashes for files, as (key, hashes) pairs, in one transaction."""
+        with self.transaction():
+            self._conn.executemany(
+                """INSERT OR REPLACE INTO hash_cache
+                (dev, ino, mtime_ns, size, phash_0, phash_90, dhash_0, dhash_90)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                [(*key, *hashes) for key, hashes in entries],
+            )
+
     # --- Raw query support ---
 
     def execute_query(
@@ -431,8 +571,46 @@ class DatabaseManager:
         finally:
             self._conn.row_factory = None
 
+    def query_images(self, sql: str, params: tuple = ()) -> list[ImageRecord]:
+        """Run a ``SELECT i.* FROM images i ...`` query and return ImageRecords.
+
+        Rows come back as plain tuples, skipping the sqlite3.Row wrapper
+        that execute_query builds. The connection's statement cache keeps
+        the prepared statement for repeated SQL text.
+        """
+        self._ensure_open()
+        rows = self._conn.execute(sql, params).fetchall()
+        return [self._row_to_image(row) for row in rows]
+
+    def query_image_groups(
+        self, sql: str, params: tuple, group_count: int
+    ) -> list[list[ImageRecord]]:
+        """Run a query whose rows are (group index, images columns...).
+
+        Returns group_count lists of ImageRecords, one per group index, so
+        several image queries can share one statement (e.g. UNION ALL).
+        """
+        self._ensure_open()
+        groups: list[list[ImageRecord]] = [[] for _ in range(group_count)]
+        for row in self._conn.execute(sql, params):
+            groups[row[0]].append(self._row_to_image(row[1:]))
+        return groups
+
     # --- Private helpers ---
 
+    def _connect(self, target: str) -> sqlite3.Connection:
+        self.invalidate_caches()
+        conn = sqlite3.connect(target)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL stays consistent with NORMAL sync; only fsyncs at checkpoints
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-131072")  # 128 MiB page cache
+        # Read pages straight from a memory map instead of copying them
+        conn.execute("PRAGMA mmap_size=1073741824")  # 1 GiB
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
     def _ensure_open(self) -> None:
         if self._conn is None:
             raise RuntimeError("Database is not open")
@@ -447,8 +625,16 @@ class DatabaseManager:
             return 0
 
     def _apply_migrations(self, from_version: int) -> None:
-        # Future migrations go here
-        pass
+        migrations = [(2, SCHEMA_V2), (3, SCHEMA_V3)]
+        for version, script in migrations:
+            if from_version >= version:
+                continue
+            self._conn.executescript(script)
+            self._conn.execute(
+                "INSERT INTO schema_version (version, applied_date) VALUES (?, ?)",
+                (version, datetime.now(timezone.utc).isoformat()),
+            )
+        self._conn.commit()
 
     def _seed_default_tags(self) -> None:
         """Insert the default tag tree into a fresh database."""
@@ -472,6 +658,55 @@ class DatabaseManager:
             )
             name_to_id[(name, parent_id)] = cursor.lastrowid
 
+    def _insert_images(self, images: list[ImageRecord]) -> list[int]:
+        """Insert images without committing. Returns the new IDs in order."""
+        now = datetime.now(timezone.utc).isoformat()
+        self._conn.executemany(
+            _INSERT_IMAGE_SQL,
+            [self._image_insert_params(image, now) for image in images],
+        )
+        # executemany leaves no per-row lastrowid; filepath is UNIQUE, so
+        # look the new IDs back up by path
+        filepaths = [image.filepath for image in images]
+        ids: dict[str, int] = {}
+        for start in range(0, len(filepaths), MAX_SQL_PARAMS):
+            chunk = filepaths[start:start + MAX_SQL_PARAMS]
+            placeholders = ", ".join("?" * len(chunk))
+            ids.update(self._conn.execute(
+                f"SELECT filepath, id FROM images WHERE filepath IN ({placeholders})",
+                chunk,
+            ))
+        return [ids[filepath] for filepath in filepaths]
+
+    def _insert_duplicate_group(self, image_ids: list[int]) -> int:
+        """Insert a duplicate group and its members without committing."""
+        now = datetime.now(timezone.utc).isoformat()
+        cursor = self._conn.execute(
+            "INSERT INTO duplicate_groups (created_date) VALUES (?)", (now,)
+        )
+        group_id = cursor.lastrowid
+        self._conn.executemany(
+            """INSERT INTO duplicate_group_members (group_id, image_id)
+            VALUES (?, ?)""",
+            [(group_id, image_id) for image_id in image_ids],
+        )
+        return group_id
+
+    @staticmethod
+    def _image_insert_params(image: ImageRecord, now: str) -> tuple:
+        return (
+            image.filepath, image.filename, image.file_size,
+            image.width, image.height,
+            image.datetime_str, image.year, image.month, image.day,
+            image.hour, image.minute, image.second,
+            image.latitude, image.longitude, int(image.has_lat_lon),
+            image.city, image.town, image.state,
+            image.phash_0, image.phash_90, image.dhash_0, image.dhash_90,
+            int(image.favorite), int(image.to_delete),
+            int(image.reviewed), int(image.auto_tag_errors),
+            now, now,
+        )
+
     def _row_to_image(self, row: tuple) -> ImageRecord:
         return ImageRecord(
             id=row[0],
@@ -4,10 +4,12 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterable, Sequence
 
+import numpy as np
 
-@dataclass
+
+@dataclass(slots=True)
 class ImageRecord:
     """Represents an image and its metadata in the database."""
 
@@ -52,6 +54,66 @@ class ImageRecord:
         self.second = dt.second
 
 
+@dataclass
+class ImageRecordArray:
+    """Column-oriented ids, file sizes and hashes for many images.
+
+    Bulk scans (e.g. duplicate detection) use this instead of one
+    ImageRecord per image. Hash columns are uint64 in HASH_FIELDS order;
+    ``valid`` marks which hashes were present and parseable, and a missing
+    file_size is stored as 0.
+    """
+
+    HASH_FIELDS = ("phash_0", "phash_90", "dhash_0", "dhash_90")
+
+    ids: np.ndarray = field(
+        default_factory=lambda: np.zeros(0, dtype=np.int64)
+    )
+    file_sizes: np.ndarray = field(
+        default_factory=lambda: np.zeros(0, dtype=np.int64)
+    )
+    hashes: np.ndarray = field(
+        default_factory=lambda: np.zeros((0, 4), dtype=np.uint64)
+    )
+    valid: np.ndarray = field(
+        default_factory=lambda: np.zeros((0, 4), dtype=bool)
+    )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_hash_rows(cls, rows: Sequence[tuple]) -> ImageRecordArray:
+        """Build from (id, file_size, phash_0, phash_90, dhash_0, dhash_90) rows."""
+        hashes = np.zeros((len(rows), 4), dtype=np.uint64)
+        valid = np.zeros(hashes.shape, dtype=bool)
+        for i, row in enumerate(rows):
+            for col, hex_hash in enumerate(row[2:6]):
+                value = hash_to_int(hex_hash)
+                if value is not None:
+                    hashes[i, col] = value
+                    valid[i, col] = True
+        return cls(
+            ids=np.array([row[0] for row in rows], dtype=np.int64),
+            file_sizes=np.array([row[1] or 0 for row in rows], dtype=np.int64),
+            hashes=hashes,
+            valid=valid,
+        )
+
+    @classmethod
+    def concatenate(cls, parts: Iterable[ImageRecordArray]) -> ImageRecordArray:
+        """Join arrays end to end."""
+        parts = list(parts)
+        if not parts:
+            return cls()
+        return cls(
+            ids=np.concatenate([p.ids for p in parts]),
+            file_sizes=np.concatenate([p.file_sizes for p in parts]),
+            hashes=np.concatenate([p.hashes for p in parts]),
+            valid=np.concatenate([p.valid for p in parts]),
+        )
+
+
 @dataclass
 class TagDefinition:
     """A node in the tag tree (category or leaf tag)."""
@@ -102,3 +164,18 @@ class ScanResult:
     skipped: int = 0
     errors: int = 0
     error_files: list[str] = field(default_factory=list)
+
+
+def hash_to_int(hex_hash: str | None) -> int | None:
+    """Parse a stored hex hash into an int, or None if missing/invalid."""
+    if not hex_hash:
+        return None
+    try:
+        return int(hex_hash, 16)
+    except ValueError:
+        return None
+
+
+def hash_to_hex(value: int) -> str:
+    """Format a 64-bit hash int as the 16-character hex string we store."""
+    return f"{value:016x}"
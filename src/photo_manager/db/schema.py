@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-CURRENT_SCHEMA_VERSION = 1
+CURRENT_SCHEMA_VERSION = 3
 
 SCHEMA_V1 = """
 CREATE TABLE IF NOT EXISTS images (
@@ -87,6 +87,33 @@ CREATE INDEX IF NOT EXISTS idx_duplicate_members_group ON duplicate_group_member
 CREATE INDEX IF NOT EXISTS idx_duplicate_members_image ON duplicate_group_members(image_id);
 """
 
+# v2: hashes keyed by file identity (device, inode, mtime, size), so
+# rescans can skip re-hashing files that have not changed. Inode numbers
+# are only unique per device, so the device is part of the key.
+SCHEMA_V2 = """
+CREATE TABLE IF NOT EXISTS hash_cache (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    phash_0 TEXT,
+    phash_90 TEXT,
+    dhash_0 TEXT,
+    dhash_90 TEXT,
+    PRIMARY KEY (dev, ino, mtime_ns, size)
+) WITHOUT ROWID;
+"""
+
+# v3: a covering (tag_id, value, image_id) index for tag-driven lookups.
+# The single-column image_tags indexes are prefixes of it and of the
+# UNIQUE(image_id, tag_id, value) index, so they only cost writes.
+SCHEMA_V3 = """
+CREATE INDEX IF NOT EXISTS idx_image_tags_tag_value
+    ON image_tags(tag_id, value, image_id);
+DROP INDEX IF EXISTS idx_image_tags_tag;
+DROP INDEX IF EXISTS idx_image_tags_image;
+"""
+
 # Default tag tree: (name, parent_name_or_None, data_type, is_category)
 # Entries are ordered so parents come before children.
 DEFAULT_TAG_TREE: list[tuple[str, str | None, str, bool]] = [
@@ -3,13 +3,17 @@
 from __future__ import annotations
 
 import csv
+import errno
+import io
 import logging
 import os
 import re
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
+from operator import attrgetter
 from pathlib import Path
-from typing import Callable
+from typing import AbstractSet, Callable
 
 from photo_manager.db.manager import DatabaseManager
 from photo_manager.db.models import ImageRecord, ImageTag
@@ -19,6 +23,35 @@ logger = logging.getLogger(__name__)
 # Callback: (current_count, total_count, filepath)
 ProgressCallback = Callable[[int, int, str], None]
 
+# Produces one directory component of an image's export path
+PathComponent = Callable[[ImageRecord], str]
+
+# Rows formatted in memory between writes to image_metadata.csv
+CSV_FLUSH_ROWS = 50_000
+
+# Template tag paths served from ImageRecord fields rather than image_tags
+_FIXED_FIELDS = {
+    "datetime.year": "year",
+    "datetime.month": "month",
+    "datetime.day": "day",
+    "datetime.hr": "hour",
+    "datetime.min": "minute",
+    "datetime.sec": "second",
+    "location.city": "city",
+    "location.town": "town",
+    "location.state": "state",
+}
+
+# Copies smaller than this are not worth a preallocation call
+_PREALLOCATE_MIN_SIZE = 1 << 20
+
+_COPY_BUFFER_SIZE = 1 << 20
+
+# copy_file_range errors meaning "not supported here", not "copy failed"
+_COPY_RANGE_UNSUPPORTED = {
+    errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF,
+}
+
 
 @dataclass
 class ExportSegment:
@@ -39,6 +72,16 @@ class ExportResult:
     error_files: list[str] = field(default_factory=list)
 
 
+@dataclass
+class _ExportPlan:
+    """Where a single image will be exported."""
+
+    image: ImageRecord
+    dest_subpath: str
+    source_path: Path
+    dest_path: Path
+
+
 def parse_export_template(template: str) -> list[ExportSegment]:
     """Parse an export template string.
 
@@ -72,6 +115,73 @@ def parse_export_template(template: str) -> list[ExportSegment]:
     return segments
 
 
+def _fast_copy(src: Path, dst: Path) -> None:
+    """Copy a file and its metadata, like shutil.copy2.
+
+    On Linux the data is copied in-kernel with os.copy_file_range, which
+    also lets reflink-capable filesystems (Btrfs, XFS) share extents
+    instead of copying bytes. When the kernel refuses, the data is copied
+    through userspace with allocation and access-pattern hints where the
+    platform has them; elsewhere shutil.copyfile's own fast paths are used.
+    """
+    if not _copy_file_range(src, dst):
+        if hasattr(os, "posix_fadvise"):
+            _hinted_copy(src, dst)
+        else:
+            shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
+
+
+def _hinted_copy(src: Path, dst: Path) -> None:
+    """Copy file data, telling the kernel how the files will be used.
+
+    Large destinations are preallocated in one go so the filesystem can
+    lay them out contiguously, the source is read-ahead sequentially, and
+    its pages are dropped from the cache afterwards since an export reads
+    each file only once.
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+        size = os.fstat(in_fd).st_size
+        _advise(in_fd, size, "POSIX_FADV_SEQUENTIAL")
+        if size >= _PREALLOCATE_MIN_SIZE:
+            try:
+                os.posix_fallocate(out_fd, 0, size)
+            except (AttributeError, OSError):
+                pass
+        shutil.copyfileobj(fsrc, fdst, _COPY_BUFFER_SIZE)
+        _advise(in_fd, size, "POSIX_FADV_DONTNEED")
+
+
+def _advise(fd: int, size: int, advice: str) -> None:
+    """Best-effort os.posix_fadvise; ignored where unsupported."""
+    try:
+        os.posix_fadvise(fd, 0, size, getattr(os, advice))
+    except (AttributeError, OSError):
+        pass
+
+
+def _copy_file_range(src: Path, dst: Path) -> bool:
+    """Copy file data with os.copy_file_range. Returns False if unsupported."""
+    if not hasattr(os, "copy_file_range"):
+        return False
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+        remaining = os.fstat(in_fd).st_size
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(in_fd, out_fd, remaining)
+                if copied == 0:
+                    # Some pseudo filesystems report no data; copy normally
+                    return False
+                remaining -= copied
+        except OSError as e:
+            if e.errno in _COPY_RANGE_UNSUPPORTED:
+                return False
+            raise
+    return True
+
+
 class ExportEngine:
     """Export images to a directory structure based on tags."""
 
@@ -87,9 +197,14 @@ class ExportEngine:
         export_csv: bool = False,
         progress_callback: ProgressCallback | None = None,
         dry_run: bool = False,
+        max_workers: int | None = None,
     ) -> ExportResult:
         """Export images to a directory structure.
 
+        Destinations are planned up front; in copy mode the copies then run
+        on a thread pool since they are I/O-bound. Moves stay sequential
+        because each one updates the database.
+
         Args:
             images: List of images to export.
             export_dir: Root export directory.
@@ -98,72 +213,83 @@ class ExportEngine:
             export_csv: Write image_metadata.csv.
             progress_callback: Progress callback.
             dry_run: If True, don't actually copy/move files.
+            max_workers: Copy threads (default min(32, 4 * CPU count)).
 
         Returns:
             ExportResult with counts.
         """
         export_dir = Path(export_dir)
-        segments = parse_export_template(template)
+        components = self._compile_template(parse_export_template(template))
         result = ExportResult(total=len(images))
         csv_rows: list[dict] = []
         db_base = self._db.db_path.parent.resolve() if self._db.db_path else Path(".")
+        done = 0
 
-        for i, image in enumerate(images):
+        def finish(image: ImageRecord, dest_subpath: str | None) -> None:
+            """Record one image as exported (dest_subpath set) or failed."""
+            nonlocal done
+            done += 1
             if progress_callback:
-                progress_callback(i + 1, len(images), image.filepath)
-
+                progress_callback(done, len(images), image.filepath)
+            if dest_subpath is None:
+                result.errors += 1
+                result.error_files.append(image.filepath)
+                return
+            if export_csv:
+                csv_rows.append(self._image_to_csv_row(image, dest_subpath))
+            result.exported += 1
+
+        # Plan every destination first, reserving names so images that
+        # collide within this export still get distinct files
+        plans: list[_ExportPlan] = []
+        reserved: set[Path] = set()
+        for image in images:
             try:
-                # Build destination path from template
-                dest_subpath = self._build_path(image, segments)
-                if dest_subpath is None:
-                    dest_subpath = "Other"
-
-                dest_dir = export_dir / dest_subpath
-                source_path = db_base / image.filepath
-
-                if not source_path.exists():
-                    logger.warning(f"Source file not found: {source_path}")
-                    result.errors += 1
-                    result.error_files.append(image.filepath)
-                    continue
-
-                dest_path = dest_dir / image.filename
-
-                # Handle filename collisions
-                if dest_path.exists():
-                    stem = dest_path.stem
-                    suffix = dest_path.suffix
-                    counter = 1
-                    while dest_path.exists():
-                        dest_path = dest_dir / f"{stem}_{counter}{suffix}"
-                        counter += 1
-
-                if not dry_run:
-                    dest_dir.mkdir(parents=True, exist_ok=True)
-                    if mode == "move":
-                        shutil.move(str(source_path), str(dest_path))
-                        # Update database path
-                        try:
-                            new_rel = dest_path.relative_to(db_base)
-                        except ValueError:
-                            new_rel = dest_path
-                        image.filepath = str(new_rel).replace("\\", "/")
-                        image.filename = dest_path.name
-                        self._db.update_image(image)
-                        # Clean up empty source directories
-                        self._cleanup_empty_dirs(source_path.parent, db_base)
-                    else:
-                        shutil.copy2(str(source_path), str(dest_path))
-
-                if export_csv:
-                    csv_rows.append(self._image_to_csv_row(image, dest_subpath))
-
-                result.exported += 1
-
+                plan = self._plan_export(
+                    image, components, export_dir, db_base, reserved
+                )
             except Exception as e:
                 logger.error(f"Error exporting {image.filepath}: {e}")
-                result.errors += 1
-                result.error_files.append(image.filepath)
+                plan = None
+            if plan is None:
+                finish(image, None)
+            else:
+                plans.append(plan)
+
+        # Create each destination directory once, up front
+        dest_dirs = {plan.dest_path.parent for plan in plans}
+        if not dry_run:
+            for dest_dir in dest_dirs:
+                os.makedirs(dest_dir, exist_ok=True)
+
+        if dry_run:
+            for plan in plans:
+                finish(plan.image, plan.dest_subpath)
+        elif mode == "move":
+            for plan in plans:
+                try:
+                    self._move_image(plan, db_base, dest_dirs)
+                except Exception as e:
+                    logger.error(f"Error exporting {plan.image.filepath}: {e}")
+                    finish(plan.image, None)
+                    continue
+                finish(plan.image, plan.dest_subpath)
+        elif plans:
+            workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(_fast_copy, plan.source_path, plan.dest_path)
+                    for plan in plans
+                ]
+                # Collect in plan order so CSV rows and errors are stable
+                for plan, future in zip(plans, futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error(f"Error exporting {plan.image.filepath}: {e}")
+                        finish(plan.image, None)
+                        continue
+                    finish(plan.image, plan.dest_subpath)
 
         # Write CSV
         if export_csv and csv_rows and not dry_run:
@@ -171,66 +297,119 @@ class ExportEngine:
 
         return result
 
-    def _build_path(
-        self, image: ImageRecord, segments: list[ExportSegment]
-    ) -> str | None:
-        """Build a destination path for an image based on the export template."""
-        parts: list[str] = []
-
-        for segment in segments:
-            if segment.literal is not None:
-                parts.append(segment.literal)
-                continue
-
-            if segment.tag_path is None:
-                continue
-
-            value = self._get_tag_value(image, segment.tag_path, segment.expand)
-            if value is None:
-                parts.append("Unknown")
-            else:
-                parts.append(value)
-
-        return "/".join(parts) if parts else None
-
-    def _get_tag_value(
-        self, image: ImageRecord, tag_path: str, expand: bool
-    ) -> str | None:
-        """Get the tag value for an image given a tag path.
-
-        For fixed fields, reads directly from the image record.
-        For dynamic tags, looks up in image_tags.
-        If expand is True, builds a full subtree path.
-        """
-        # Check fixed fields first
-        fixed_value = self._get_fixed_value(image, tag_path)
-        if fixed_value is not None:
-            return str(fixed_value)
-
-        if image.id is None:
-            return None
-
-        # Dynamic tag lookup
-        tag_def = self._db.resolve_tag_path(tag_path)
-        if tag_def is None:
+    def _plan_export(
+        self,
+        image: ImageRecord,
+        components: list[PathComponent],
+        export_dir: Path,
+        db_base: Path,
+        reserved: set[Path],
+    ) -> _ExportPlan | None:
+        """Pick the destination for one image, or None if its source is missing."""
+        # Build destination path from template
+        dest_subpath = "/".join(component(image) for component in components)
+        if not dest_subpath:
+            dest_subpath = "Other"
+
+        dest_dir = export_dir / dest_subpath
+        source_path = db_base / image.filepath
+
+        if not source_path.exists():
+            logger.warning(f"Source file not found: {source_path}")
             return None
 
-        if expand:
-            # Get all child tags for this image under this category
-            return self._get_expanded_tag_value(image.id, tag_def.id)
-        else:
-            # Get direct tag value
-            tags = self._db.get_image_tags(image.id)
+        dest_path = dest_dir / image.filename
+
+        # Handle filename collisions, both on disk and within this export
+        if dest_path in reserved or dest_path.exists():
+            stem = dest_path.stem
+            suffix = dest_path.suffix
+            counter = 1
+            while dest_path in reserved or dest_path.exists():
+                dest_path = dest_dir / f"{stem}_{counter}{suffix}"
+                counter += 1
+        reserved.add(dest_path)
+
+        return _ExportPlan(image, dest_subpath, source_path, dest_path)
+
+    def _move_image(
+        self, plan: _ExportPlan, db_base: Path, dest_dirs: set[Path]
+    ) -> None:
+        """Move an image to its planned destination and update the database."""
+        image = plan.image
+        shutil.move(str(plan.source_path), str(plan.dest_path))
+        # Update database path
+        try:
+            new_rel = plan.dest_path.relative_to(db_base)
+        except ValueError:
+            new_rel = plan.dest_path
+        image.filepath = str(new_rel).replace("\\", "/")
+        image.filename = plan.dest_path.name
+        self._db.update_image(image)
+        # Clean up empty source directories
+        self._cleanup_empty_dirs(plan.source_path.parent, db_base, dest_dirs)
+
+    def _compile_template(
+        self, segments: list[ExportSegment]
+    ) -> list[PathComponent]:
+        """Turn template segments into per-image path component functions.
+
+        Field getters and tag definitions are resolved here, once per
+        export, rather than for every image.
+        """
+        return [
+            self._compile_segment(segment)
+            for segment in segments
+            if segment.literal is not None or segment.tag_path is not None
+        ]
+
+    def _compile_segment(self, segment: ExportSegment) -> PathComponent:
+        """Build the path component function for one template segment.
+
+        Fixed fields are read from the image record; when unset (or for
+        dynamic tags) the value comes from image_tags, expanding the tag
+        subtree for ``>`` segments. Missing values become "Unknown".
+        """
+        if segment.literal is not None:
+            literal = segment.literal
+            return lambda image: literal
+
+        field_name = _FIXED_FIELDS.get(segment.tag_path)
+        get_fixed = attrgetter(field_name) if field_name else None
+        tag_def = self._db.resolve_tag_path(segment.tag_path)
+        tag_id = tag_def.id if tag_def else None
+        lookup = (
+            self._get_expanded_tag_value if segment.expand
+            else self._get_direct_tag_value
+        )
+
+        def component(image: ImageRecord) -> str:
+            if get_fixed is not None:
+                fixed_value = get_fixed(image)
+                if fixed_value is not None:
+                    return str(fixed_value)
+            if image.id is None or tag_id is None:
+                return "Unknown"
+            value = lookup(image.id, tag_id)
+            return "Unknown" if value is None else value
+
+        return component
+
+    def _get_direct_tag_value(
+        self, image_id: int, tag_def_id: int
+    ) -> str | None:
+        """Get an image's value for a tag, or for one of its child tags."""
+        tags = self._db.get_image_tags(image_id)
+        for tag in tags:
+            if tag.tag_id == tag_def_id and tag.value:
+                return tag.value
+        # Check children for value
+        children = self._db.get_tag_children(tag_def_id)
+        for child in children:
             for tag in tags:
-                if tag.tag_id == tag_def.id and tag.value:
+                if tag.tag_id == child.id and tag.value:
                     return tag.value
-            # Check children for value
-            children = self._db.get_tag_children(tag_def.id)
-            for child in children:
-                for tag in tags:
-                    if tag.tag_id == child.id and tag.value:
-                        return tag.value
-            return None
+        return None
 
     def _get_expanded_tag_value(
         self, image_id: int, tag_def_id: int
@@ -270,23 +449,6 @@ class ExportEngine:
         # Combine multiple tag values with underscore
         return "/".join(path_parts)
 
-    def _get_fixed_value(
-        self, image: ImageRecord, tag_path: str
-    ) -> str | int | None:
-        """Get a value from fixed image record fields."""
-        mapping = {
-            "datetime.year": image.year,
-            "datetime.month": image.month,
-            "datetime.day": image.day,
-            "datetime.hr": image.hour,
-            "datetime.min": image.minute,
-            "datetime.sec": image.second,
-            "location.city": image.city,
-            "location.town": image.town,
-            "location.state": image.state,
-        }
-        return mapping.get(tag_path)
-
     def _image_to_csv_row(
         self, image: ImageRecord, dest_subpath: str
     ) -> dict:
@@ -313,28 +475,50 @@ class ExportEngine:
                     row[f"tag_{tag_def.name}"] = tag.value
         return row
 
-    def _write_csv(self, path: Path, rows: list[dict]) -> None:
-        """Write image metadata to CSV."""
+    def _write_csv(
+        self, path: Path, rows: list[dict], flush_every: int = CSV_FLUSH_ROWS
+    ) -> None:
+        """Write image metadata to CSV.
+
+        Rows are formatted into an in-memory buffer and written to the file
+        in blocks of ``flush_every`` rows, so slow (e.g. network) export
+        targets see a few large writes rather than one per row.
+        """
         if not rows:
             return
-        # Collect all possible fields
-        all_fields: list[str] = []
-        seen: set[str] = set()
+        # Collect all possible fields (dicts keep insertion order)
+        all_fields: dict[str, None] = {}
         for row in rows:
-            for key in row:
-                if key not in seen:
-                    all_fields.append(key)
-                    seen.add(key)
+            all_fields.update(dict.fromkeys(row))
+        fields = list(all_fields)
 
+        # Plain csv.writer: DictWriter re-validates every row's keys
+        buffer = io.StringIO(newline="")
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
         with open(path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=all_fields)
-            writer.writeheader()
-            writer.writerows(rows)
-
-    def _cleanup_empty_dirs(self, directory: Path, stop_at: Path) -> None:
-        """Recursively remove empty directories up to stop_at."""
+            for start in range(0, len(rows), flush_every):
+                writer.writerows(
+                    [row.get(field, "") for field in fields]
+                    for row in rows[start:start + flush_every]
+                )
+                f.write(buffer.getvalue())
+                buffer.seek(0)
+                buffer.truncate()
+
+    def _cleanup_empty_dirs(
+        self, directory: Path, stop_at: Path, keep: AbstractSet[Path] = frozenset()
+    ) -> None:
+        """Recursively remove empty directories up to stop_at.
+
+        Directories in ``keep`` (pending export destinations) are left alone.
+        """
         try:
-            while directory != stop_at and directory.is_dir():
+            while (
+                directory != stop_at
+                and directory not in keep
+                and directory.is_dir()
+            ):
                 if any(directory.iterdir()):
                     break
                 directory.rmdir()
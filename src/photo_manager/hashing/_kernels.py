@@ -0,0 +1,223 @@
+"""Vectorized Hamming-distance kernels for duplicate detection."""
+
+from __future__ import annotations
+
+from typing import Iterator
+
+import numpy as np
+
+# Rows per tile side; a 512x512 tile of per-rotation distances (uint8)
+# is ~1 MiB, small enough to stay cache-resident
+BLOCK_SIZE = 512
+
+# Distance reported for missing/invalid hashes; larger than any real one
+NO_HASH_DISTANCE = 65
+
+
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
+
+def _popcount64_swar(values: np.ndarray) -> np.ndarray:
+    """Per-element popcount of a uint64 array for NumPy < 2.0.
+
+    Branchless SWAR bit count: sum bits in pairs, nibbles, then bytes, and
+    gather the byte sums into the top byte with one multiply (which wraps
+    mod 2**64, as intended).
+    """
+    x = values - ((values >> np.uint64(1)) & _M1)
+    x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+    x = (x + (x >> np.uint64(4))) & _M4
+    return ((x * _H01) >> np.uint64(56)).astype(np.uint8)
+
+
+popcount64 = getattr(np, "bitwise_count", _popcount64_swar)
+
+
+def min_distances(
+    a: np.ndarray, a_valid: np.ndarray, b: np.ndarray, b_valid: np.ndarray
+) -> np.ndarray:
+    """Smallest Hamming distance over all rotation pairs, for every a x b pair.
+
+    ``a`` is (M, R) and ``b`` is (K, R) uint64; the result is (M, K).
+    Pairs involving a missing hash count as NO_HASH_DISTANCE.
+    """
+    dist = popcount64(a[:, None, :, None] ^ b[None, :, None, :])
+    if a_valid.all() and b_valid.all():
+        return dist.min(axis=(2, 3))
+    present = a_valid[:, None, :, None] & b_valid[None, :, None, :]
+    return np.where(present, dist, NO_HASH_DISTANCE).min(axis=(2, 3))
+
+
+def pair_distances(
+    a: np.ndarray, a_valid: np.ndarray, b: np.ndarray, b_valid: np.ndarray
+) -> np.ndarray:
+    """Like min_distances, but for matched rows: a[n] against b[n] only."""
+    dist = popcount64(a[:, :, None] ^ b[:, None, :])
+    present = a_valid[:, :, None] & b_valid[:, None, :]
+    return np.where(present, dist, NO_HASH_DISTANCE).min(axis=(1, 2))
+
+
+# Narrowest chunk worth indexing on; below this nearly every pair collides
+MIN_INDEX_CHUNK_BITS = 8
+
+# Candidate pairs verified per batch by the hash index
+PAIR_BATCH_SIZE = 1 << 22
+
+_NO_ROWS = np.empty(0, dtype=np.intp)
+
+
+def iter_duplicate_pairs(
+    phashes: np.ndarray,
+    phash_valid: np.ndarray,
+    dhashes: np.ndarray,
+    dhash_valid: np.ndarray,
+    threshold: int,
+    block_size: int = BLOCK_SIZE,
+) -> Iterator[tuple[np.ndarray, np.ndarray, int, int]]:
+    """Find row pairs whose pHash AND dHash are both within threshold.
+
+    Uses the pigeonhole index when the threshold is small enough for it to
+    prune, otherwise the tiled all-pairs scan. Both yield batches of
+    (rows, cols, done, total) with rows < cols; done/total is progress in
+    method-specific units. A pair may appear in more than one batch.
+    """
+    # The index generalizes bucketing on a fixed bit prefix (e.g. the top
+    # byte): it buckets on every chunk, so no true pair is missed. Past the
+    # cutoff no prefix filter helps either; with threshold >= 8, two hashes
+    # may differ in all 8 bits of any byte, so every bucket pair survives.
+    if 64 // (threshold + 1) >= MIN_INDEX_CHUNK_BITS:
+        return iter_indexed_pairs(
+            phashes, phash_valid, dhashes, dhash_valid, threshold
+        )
+    return iter_tiled_pairs(
+        phashes, phash_valid, dhashes, dhash_valid, threshold, block_size
+    )
+
+
+def iter_indexed_pairs(
+    phashes: np.ndarray,
+    phash_valid: np.ndarray,
+    dhashes: np.ndarray,
+    dhash_valid: np.ndarray,
+    threshold: int,
+) -> Iterator[tuple[np.ndarray, np.ndarray, int, int]]:
+    """Find duplicate pairs via a pigeonhole (multi-index) hash index.
+
+    The 64 hash bits are split into threshold + 1 disjoint chunks. Two
+    hashes within ``threshold`` bits of each other must agree exactly on at
+    least one chunk, so grouping rows by each chunk's value yields every
+    candidate pair without comparing all N^2 of them. Candidates are then
+    verified with the full pHash and dHash distances.
+    """
+    chunks = threshold + 1
+    bounds = np.linspace(0, 64, chunks + 1).astype(int)
+    rows_per_hash = np.repeat(np.arange(len(phashes)), phashes.shape[1])
+    flat_hashes = phashes.ravel()
+    flat_valid = phash_valid.ravel()
+
+    for chunk, (low, high) in enumerate(zip(bounds[:-1], bounds[1:])):
+        mask = np.uint64((1 << int(high - low)) - 1)
+        keys = (flat_hashes >> np.uint64(low)) & mask
+        for rows, cols in _iter_equal_key_pairs(
+            keys[flat_valid], rows_per_hash[flat_valid]
+        ):
+            keep = (
+                pair_distances(
+                    phashes[rows], phash_valid[rows],
+                    phashes[cols], phash_valid[cols],
+                ) <= threshold
+            )
+            rows, cols = rows[keep], cols[keep]
+            keep = (
+                pair_distances(
+                    dhashes[rows], dhash_valid[rows],
+                    dhashes[cols], dhash_valid[cols],
+                ) <= threshold
+            )
+            yield rows[keep], cols[keep], chunk, chunks
+        yield _NO_ROWS, _NO_ROWS, chunk + 1, chunks
+
+
+def _iter_equal_key_pairs(
+    keys: np.ndarray, rows: np.ndarray, batch_size: int = PAIR_BATCH_SIZE
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """Yield (a, b) row pairs with a < b whose entries share a key.
+
+    Pairs come in batches of roughly ``batch_size`` to bound memory when
+    many hashes share a chunk value. A pair can repeat when several of its
+    rotations share the key; callers verify and union pairs idempotently,
+    so that is cheaper than sorting them away.
+    """
+    if len(keys) < 2:
+        return
+    order = np.argsort(keys, kind="stable")
+    keys, rows = keys[order], rows[order]
+    # For each sorted position, the number of later positions in its run
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)]
+    counts = np.repeat(ends, ends - starts) - np.arange(len(keys)) - 1
+    cumulative = np.cumsum(counts)
+    cuts = np.searchsorted(
+        cumulative, np.arange(batch_size, cumulative[-1], batch_size)
+    )
+
+    for first, last in zip(np.r_[0, cuts], np.r_[cuts, len(keys)]):
+        batch_counts = counts[first:last]
+        left = np.repeat(np.arange(first, last), batch_counts)
+        if not len(left):
+            continue
+        # Pair each position with every later position in its run
+        offsets = np.arange(len(left)) - np.repeat(
+            np.cumsum(batch_counts) - batch_counts, batch_counts
+        )
+        a, b = rows[left], rows[left + 1 + offsets]
+        distinct = a != b
+        a, b = a[distinct], b[distinct]
+        yield np.minimum(a, b), np.maximum(a, b)
+
+
+def iter_tiled_pairs(
+    phashes: np.ndarray,
+    phash_valid: np.ndarray,
+    dhashes: np.ndarray,
+    dhash_valid: np.ndarray,
+    threshold: int,
+    block_size: int = BLOCK_SIZE,
+) -> Iterator[tuple[np.ndarray, np.ndarray, int, int]]:
+    """Find duplicate pairs by comparing every pair, tile by tile.
+
+    Works through the upper triangle of the N x N comparison one tile at a
+    time. The pHash tile is computed in full; dHash is only checked for the
+    (usually few) pairs that pass it. Progress is counted in pairs.
+    """
+    total = len(phashes)
+    total_pairs = total * (total - 1) // 2
+    compared = 0
+    for start_i in range(0, total, block_size):
+        stop_i = min(start_i + block_size, total)
+        for start_j in range(start_i, total, block_size):
+            stop_j = min(start_j + block_size, total)
+            close = min_distances(
+                phashes[start_i:stop_i], phash_valid[start_i:stop_i],
+                phashes[start_j:stop_j], phash_valid[start_j:stop_j],
+            ) <= threshold
+            if start_i == start_j:
+                # Diagonal tile: keep each pair once, never self-pairs
+                close = np.triu(close, k=1)
+                compared += (stop_i - start_i) * (stop_i - start_i - 1) // 2
+            else:
+                compared += (stop_i - start_i) * (stop_j - start_j)
+
+            rows, cols = np.nonzero(close)
+            if len(rows):
+                rows += start_i
+                cols += start_j
+                keep = pair_distances(
+                    dhashes[rows], dhash_valid[rows],
+                    dhashes[cols], dhash_valid[cols],
+                ) <= threshold
+                rows, cols = rows[keep], cols[keep]
+            yield rows, cols, compared, total_pairs
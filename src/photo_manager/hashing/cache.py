@@ -0,0 +1,58 @@
+"""Persistent hash cache keyed by file identity."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from photo_manager.db.manager import DatabaseManager
+from photo_manager.hashing.hasher import ImageHashes, compute_hashes
+
+# (st_dev, st_ino, st_mtime_ns, st_size); inodes are only unique per
+# device, and mtime/size change whenever the file's content does
+FileKey = tuple[int, int, int, int]
+
+
+class HashCache:
+    """Cache of computed hashes stored in the library database.
+
+    Entries are keyed by a file's device, inode, modification time and
+    size, so a rescan only re-hashes files that were added or changed.
+    """
+
+    def __init__(self, db: DatabaseManager):
+        self._db = db
+
+    @staticmethod
+    def file_key(filepath: str | Path) -> FileKey | None:
+        """Identity key for a file, or None if it cannot be stat'ed."""
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+        return (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def get(self, key: FileKey | None) -> ImageHashes | None:
+        """Look up cached hashes for a file key."""
+        if key is None:
+            return None
+        row = self._db.get_cached_hashes(key)
+        return ImageHashes(*row) if row else None
+
+    def put_many(self, entries: list[tuple[FileKey, ImageHashes]]) -> None:
+        """Store hashes for several file keys at once."""
+        if entries:
+            self._db.store_cached_hashes([
+                (key, (h.phash_0, h.phash_90, h.dhash_0, h.dhash_90))
+                for key, h in entries
+            ])
+
+    def compute(self, filepath: str | Path) -> ImageHashes | None:
+        """Hash a file, reusing the cached result if it is unchanged."""
+        key = self.file_key(filepath)
+        hashes = self.get(key)
+        if hashes is None:
+            hashes = compute_hashes(filepath)
+            if hashes is not None and key is not None:
+                self.put_many([(key, hashes)])
+        return hashes
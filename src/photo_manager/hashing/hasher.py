@@ -3,21 +3,48 @@
 from __future__ import annotations
 
 import logging
-from concurrent.futures import ThreadPoolExecutor, Future
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
+from itertools import repeat
 from pathlib import Path
-from typing import Callable
+from typing import TYPE_CHECKING, Callable, Iterator
 
-import imagehash
+import numpy as np
 from PIL import Image
 
 from photo_manager.scanner.exif import get_oriented_image
 
+if TYPE_CHECKING:
+    from photo_manager.hashing.cache import FileKey, HashCache
+
 logger = logging.getLogger(__name__)
 
 # Callback: (current_count, total_count, filepath)
 ProgressCallback = Callable[[int, int, str], None]
 
+# Hash geometry matches imagehash's defaults (8x8 bits, 4x high-freq factor)
+_HASH_SIZE = 8
+_PHASH_IMG_SIZE = _HASH_SIZE * 4
+
+
+def _dct_basis(n: int) -> np.ndarray:
+    """Unnormalized DCT-II basis, equivalent to scipy.fftpack.dct(type=2)."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    return 2.0 * np.cos(np.pi * k * (2 * i + 1) / (2 * n))
+
+
+# With compute_hashes(draft=True), JPEGs are downscaled in the DCT domain
+# while decoding, but never below this; still well above the 32x32 the
+# hashes resample to
+_DECODE_DRAFT_SIZE = (_PHASH_IMG_SIZE * 4, _PHASH_IMG_SIZE * 4)
+
+# Only the low-frequency rows are needed: 8x32 @ 32x32 @ 32x8 per image
+_DCT_LOW = np.ascontiguousarray(_dct_basis(_PHASH_IMG_SIZE)[:_HASH_SIZE])
+
 
 @dataclass
 class ImageHashes:
@@ -29,66 +56,245 @@ class ImageHashes:
     dhash_90: str
 
 
-def compute_hashes(filepath: str | Path) -> ImageHashes | None:
+def compute_hashes(
+    source: str | Path | Image.Image, draft: bool = False
+) -> ImageHashes | None:
     """Compute perceptual hashes for an image at 0 and 90 degree rotations.
 
     The image is first corrected for EXIF orientation, then hashed at
-    its corrected orientation (0) and rotated 90 degrees.
+    its corrected orientation (0) and rotated 90 degrees. An already-open
+    PIL image is hashed as given and left open for the caller.
+
+    Files are fully decoded by default, so the hashes match imagehash and
+    those stored by earlier scans. With ``draft``, JPEGs are decoded at a
+    reduced DCT scale: much faster, but a hash can move by a bit or two.
+    Duplicate detection compares stored hashes directly, so only use it
+    when rehashing the whole library, not for files added to one.
     """
     try:
-        img = get_oriented_image(filepath)
-        # Convert to RGB if necessary (some formats like P or RGBA)
-        if img.mode not in ("RGB", "L"):
-            img = img.convert("RGB")
-
-        # Hash at 0 degrees (EXIF-corrected orientation)
-        phash_0 = str(imagehash.phash(img))
-        dhash_0 = str(imagehash.dhash(img))
-
-        # Hash at 90 degrees
-        img_90 = img.transpose(Image.Transpose.ROTATE_90)
-        phash_90 = str(imagehash.phash(img_90))
-        dhash_90 = str(imagehash.dhash(img_90))
-
-        img.close()
-        img_90.close()
-
-        return ImageHashes(
-            phash_0=phash_0,
-            phash_90=phash_90,
-            dhash_0=dhash_0,
-            dhash_90=dhash_90,
+        if isinstance(source, Image.Image):
+            return _hash_image(source)
+        img = get_oriented_image(
+            source, draft_size=_DECODE_DRAFT_SIZE if draft else None
         )
+        try:
+            return _hash_image(img)
+        finally:
+            img.close()
     except Exception as e:
-        logger.error(f"Failed to compute hashes for {filepath}: {e}")
+        logger.error(f"Failed to compute hashes for {source}: {e}")
         return None
 
 
+def _hash_image(img: Image.Image) -> ImageHashes:
+    # Convert to RGB if necessary (some formats like P or RGBA)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    # Both hashes only look at luminance, so convert once and rotate
+    # the single-channel plane rather than the full RGB image
+    luma = img.convert("L")
+    luma_90 = luma.transpose(Image.Transpose.ROTATE_90)
+
+    # Hash at 0 degrees (EXIF-corrected orientation) and 90 degrees
+    phash_0, phash_90 = _phashes([luma, luma_90])
+    dhash_0 = _dhash(luma)
+    dhash_90 = _dhash(luma_90)
+
+    luma.close()
+    luma_90.close()
+
+    return ImageHashes(
+        phash_0=phash_0,
+        phash_90=phash_90,
+        dhash_0=dhash_0,
+        dhash_90=dhash_90,
+    )
+
+
+def _phashes(lumas: list[Image.Image]) -> list[str]:
+    """Perceptual hashes of grayscale images, as imagehash.phash computes them.
+
+    Bit-identical to imagehash for the same input image; a drafted JPEG
+    decode (see compute_hashes) is a different input and may differ.
+
+    Each image is resized separately (resampling does not commute with
+    rotation), then the 2-D DCTs of all planes are computed as one batched
+    pair of matrix products against a precomputed cosine basis.
+    """
+    stack = np.stack([
+        np.asarray(
+            luma.resize(
+                (_PHASH_IMG_SIZE, _PHASH_IMG_SIZE), Image.Resampling.LANCZOS
+            ),
+            dtype=np.float64,
+        )
+        for luma in lumas
+    ])
+    dct_low = _DCT_LOW @ stack @ _DCT_LOW.T
+    medians = np.median(dct_low, axis=(1, 2), keepdims=True)
+    return [_bits_to_hex(bits) for bits in dct_low > medians]
+
+
+def _dhash(luma: Image.Image) -> str:
+    """Difference hash of a grayscale image, identical to imagehash.dhash."""
+    small = luma.resize((_HASH_SIZE + 1, _HASH_SIZE), Image.Resampling.LANCZOS)
+    pixels = np.asarray(small)
+    return _bits_to_hex(pixels[:, 1:] > pixels[:, :-1])
+
+
+def _bits_to_hex(bits: np.ndarray) -> str:
+    """Pack an 8x8 boolean array (row-major, MSB first) into 16 hex chars."""
+    return np.packbits(bits).tobytes().hex()
+
+
+def compute_hashes_batch(
+    filepaths: list[str | Path], max_workers: int | None = None
+) -> list[ImageHashes | None]:
+    """Compute hashes for many images, spreading the work across processes.
+
+    Hashing is CPU-bound (decode, resize, DCT), so batches of more than one
+    image are dispatched to a process pool to sidestep the GIL. Results are
+    returned in the same order as ``filepaths``.
+    """
+    if len(filepaths) <= 1:
+        return [compute_hashes(f) for f in filepaths]
+
+    workers = min(max_workers or os.cpu_count() or 1, len(filepaths))
+    chunksize = max(1, len(filepaths) // (workers * 4))
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=_worker_context()
+    ) as executor:
+        return list(executor.map(compute_hashes, filepaths, chunksize=chunksize))
+
+
+def _worker_context() -> multiprocessing.context.BaseContext:
+    """Start method for hashing workers.
+
+    Forkserver avoids forking a parent that may be running Qt or other
+    threads; platforms without it fall back to their default (spawn).
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context()
+
+
+def _hash_files(filepaths: list[str]) -> list[ImageHashes | None]:
+    """Hash a batch of files inside a worker process."""
+    return [compute_hashes(f) for f in filepaths]
+
+
+@dataclass
+class _HashJob:
+    """One submitted image; ``cached`` is set when the cache already had it."""
+
+    image_id: int
+    filepath: str
+    key: FileKey | None = None
+    cached: ImageHashes | None = None
+
+
 class BackgroundHasher:
-    """Compute hashes for multiple images in background threads."""
+    """Compute hashes for multiple images in background worker processes.
 
-    def __init__(self, max_workers: int = 2):
-        self._executor = ThreadPoolExecutor(max_workers=max_workers)
-        self._futures: list[tuple[int, str, Future]] = []
+    Hashing is CPU-bound, so it runs in a process pool rather than threads.
+    Submitted images are queued and sent to the pool ``batch_size`` at a
+    time, so each worker round-trip hashes several images. With a
+    HashCache, unchanged files are answered from the cache at submit time
+    and only cache misses reach the workers.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        batch_size: int = 16,
+        cache: HashCache | None = None,
+    ):
+        self._max_workers = max_workers
+        self._batch_size = batch_size
+        self._cache = cache
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending: deque[_HashJob] = deque()
+        self._batches: list[tuple[list[_HashJob], Future]] = []
 
     def submit(self, image_id: int, filepath: str | Path) -> None:
         """Submit an image for background hashing."""
-        future = self._executor.submit(compute_hashes, filepath)
-        self._futures.append((image_id, str(filepath), future))
+        job = _HashJob(image_id, str(filepath))
+        if self._cache is not None:
+            job.key = self._cache.file_key(filepath)
+            job.cached = self._cache.get(job.key)
+        self._pending.append(job)
+        if len(self._pending) >= self._batch_size:
+            self._dispatch()
 
     def get_results(self) -> list[tuple[int, ImageHashes | None]]:
-        """Get all completed results. Blocks until all are done."""
+        """Get all results in submission order. Blocks until all are done."""
+        self._dispatch()
         results = []
-        for image_id, filepath, future in self._futures:
-            try:
-                hashes = future.result()
-                results.append((image_id, hashes))
-            except Exception as e:
-                logger.error(f"Hash computation failed for {filepath}: {e}")
-                results.append((image_id, None))
-        self._futures.clear()
+        for batch, future in self._batches:
+            results.extend(self._batch_results(batch, future))
+        self._batches.clear()
         return results
 
+    def iter_results(self) -> Iterator[tuple[int, ImageHashes | None]]:
+        """Yield results batch by batch as workers finish them.
+
+        Lets the caller store hashes while later batches are still running.
+        """
+        self._dispatch()
+        batches = {future: batch for batch, future in self._batches}
+        self._batches.clear()
+        for future in as_completed(batches):
+            yield from self._batch_results(batches[future], future)
+
     def shutdown(self, wait: bool = True) -> None:
-        """Shut down the thread pool."""
-        self._executor.shutdown(wait=wait)
+        """Shut down the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def _dispatch(self) -> None:
+        """Send all queued images to the pool in batches."""
+        while self._pending:
+            count = min(self._batch_size, len(self._pending))
+            batch = [self._pending.popleft() for _ in range(count)]
+            misses = [job.filepath for job in batch if job.cached is None]
+            if misses:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self._max_workers,
+                        mp_context=_worker_context(),
+                    )
+                future = self._executor.submit(_hash_files, misses)
+            else:
+                # Fully cached batch: nothing for the workers to do
+                future = Future()
+                future.set_result([])
+            self._batches.append((batch, future))
+
+    def _batch_results(
+        self, batch: list[_HashJob], future: Future
+    ) -> list[tuple[int, ImageHashes | None]]:
+        """Merge a batch's worker results with its cache hits, in order."""
+        try:
+            computed = iter(future.result())
+        except Exception as e:
+            for job in batch:
+                if job.cached is None:
+                    logger.error(
+                        f"Hash computation failed for {job.filepath}: {e}"
+                    )
+            computed = repeat(None)
+
+        results = []
+        new_entries = []
+        for job in batch:
+            hashes = job.cached
+            if hashes is None:
+                hashes = next(computed)
+                if hashes is not None and job.key is not None:
+                    new_entries.append((job.key, hashes))
+            results.append((job.image_id, hashes))
+        if self._cache is not None:
+            self._cache.put_many(new_entries)
+        return results
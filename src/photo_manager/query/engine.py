@@ -2,16 +2,19 @@
 
 from __future__ import annotations
 
-from typing import Any
+from collections import OrderedDict
+from typing import Any, Hashable
 
-from photo_manager.db.manager import DatabaseManager
+from photo_manager.db.manager import MAX_SQL_PARAMS, DatabaseManager
 from photo_manager.db.models import ImageRecord
 from photo_manager.query.parser import (
     ASTNode,
     ComparisonNode,
     LogicalNode,
+    ast_key,
     parse_query,
 )
+from photo_manager.query.simplify import flatten, simplify
 
 # Tag paths that map directly to columns on the images table
 FIXED_FIELD_MAP: dict[str, str] = {
@@ -36,6 +39,30 @@ FIXED_FIELD_MAP: dict[str, str] = {
     "image_size.height": "height",
 }
 
+# Compiled (where_clause, params) kept per engine for recently used ASTs
+SQL_CACHE_SIZE = 128
+
+# SELECTs per compound statement; SQLite's default SQLITE_MAX_COMPOUND_SELECT
+MAX_UNION_BRANCHES = 500
+
+BOOL_COLUMNS = frozenset({
+    "favorite", "to_delete", "reviewed", "auto_tag_errors", "has_lat_lon",
+})
+
+INT_COLUMNS = frozenset({
+    "year", "month", "day", "hour", "minute", "second", "width", "height",
+})
+
+# Tag paths whose values compare as integers, for AST simplification
+NUMERIC_PATHS = frozenset(
+    path for path, column in FIXED_FIELD_MAP.items() if column in INT_COLUMNS
+)
+
+# images columns with an index of their own (see schema.SCHEMA_V1)
+INDEXED_COLUMNS = frozenset({
+    "year", "datetime", "favorite", "to_delete", "reviewed",
+})
+
 SQL_OPERATORS: dict[str, str] = {
     "==": "=",
     "!=": "!=",
@@ -52,139 +79,211 @@ class QueryEngine:
     def __init__(self, db: DatabaseManager):
         self._db = db
         self._join_counter = 0
+        self._sql_cache: OrderedDict[Hashable, tuple[str, tuple]] = OrderedDict()
+        self._sql_generation = db.tag_generation
 
     def query(self, expression: str) -> list[ImageRecord]:
         """Parse and execute a query expression, returning matching images."""
-        ast = parse_query(expression)
+        ast = simplify(parse_query(expression), NUMERIC_PATHS)
         sql, params = self.to_sql(ast)
-        rows = self._db.execute_query(sql, tuple(params))
-        # Convert Row objects back to tuples for _row_to_image
-        return [
-            self._db._row_to_image(tuple(row))
-            for row in rows
-        ]
+        return self._db.query_images(sql, tuple(params))
+
+    def query_many(self, expressions: list[str]) -> list[list[ImageRecord]]:
+        """Execute several query expressions in as few SQL statements as fit.
+
+        Each expression becomes one UNION ALL branch tagged with its index;
+        a new statement is started before the bound parameters or branch
+        count would exceed SQLite's limits. Returns one result list per
+        expression, in the same order.
+        """
+        results: list[list[ImageRecord]] = []
+        branches: list[str] = []
+        params: list[Any] = []
+        for expression in expressions:
+            ast = simplify(parse_query(expression), NUMERIC_PATHS)
+            where_clause, branch_params = self._where_sql(ast)
+            if branches and (
+                len(branches) == MAX_UNION_BRANCHES
+                or len(params) + len(branch_params) > MAX_SQL_PARAMS
+            ):
+                results.extend(self._query_branches(branches, params))
+                branches, params = [], []
+            branches.append(
+                f"SELECT {len(branches)}, i.* FROM images i WHERE {where_clause}"
+            )
+            params.extend(branch_params)
+        if branches:
+            results.extend(self._query_branches(branches, params))
+        return results
+
+    def _query_branches(
+        self, branches: list[str], params: list[Any]
+    ) -> list[list[ImageRecord]]:
+        """Run index-tagged SELECT branches as one UNION ALL statement."""
+        return self._db.query_image_groups(
+            " UNION ALL ".join(branches), tuple(params), len(branches)
+        )
 
     def to_sql(self, ast: ASTNode) -> tuple[str, list[Any]]:
         """Convert an AST to a SQL query.
 
-        Returns (sql_string, params_list).
+        Returns (sql_string, params_list). Results are cached by the AST's
+        structure, so recompiling an equal tree is a dict lookup.
         """
+        where_clause, params = self._where_sql(ast)
+        return f"SELECT i.* FROM images i WHERE {where_clause}", list(params)
+
+    def _where_sql(self, ast: ASTNode) -> tuple[str, tuple[Any, ...]]:
+        """The WHERE clause and params for an AST, from the cache if present."""
+        if self._sql_generation != self._db.tag_generation:
+            # Compiled SQL embeds tag IDs; drop it when the tag tree changes
+            self._sql_cache.clear()
+            self._sql_generation = self._db.tag_generation
+        key = ast_key(ast)
+        cached = self._sql_cache.get(key)
+        if cached is not None:
+            self._sql_cache.move_to_end(key)
+            return cached
+
         self._join_counter = 0
-        where_clause, params, joins = self._node_to_sql(ast)
-        join_str = " ".join(joins)
-        sql = f"SELECT DISTINCT i.* FROM images i {join_str} WHERE {where_clause}"
-        return sql, params
-
-    def _node_to_sql(
-        self, node: ASTNode
-    ) -> tuple[str, list[Any], list[str]]:
+        where_clause, params = self._node_to_sql(ast)
+        compiled = (where_clause, tuple(params))
+        self._sql_cache[key] = compiled
+        if len(self._sql_cache) > SQL_CACHE_SIZE:
+            self._sql_cache.popitem(last=False)
+        return compiled
+
+    def _node_to_sql(self, node: ASTNode) -> tuple[str, list[Any]]:
         """Recursively convert an AST node to SQL components.
 
-        Returns (where_clause, params, joins).
+        Returns (where_clause, params).
         """
         if isinstance(node, LogicalNode):
-            left_where, left_params, left_joins = self._node_to_sql(node.left)
-            right_where, right_params, right_joins = self._node_to_sql(node.right)
-
-            sql_op = "AND" if node.operator == "&&" else "OR"
-            where = f"({left_where} {sql_op} {right_where})"
-            return where, left_params + right_params, left_joins + right_joins
+            if node.operator == "||":
+                return self._or_chain_to_sql(flatten(node, "||"))
+            return self._and_chain_to_sql(flatten(node, "&&"))
 
         if isinstance(node, ComparisonNode):
             return self._comparison_to_sql(node)
 
         raise ValueError(f"Unknown AST node type: {type(node)}")
 
-    def _comparison_to_sql(
-        self, node: ComparisonNode
-    ) -> tuple[str, list[Any], list[str]]:
+    def _and_chain_to_sql(self, terms: list[ASTNode]) -> tuple[str, list[Any]]:
+        """Convert the operands of an AND chain to SQL.
+
+        Operands are emitted cheapest first (see _and_term_cost), so cheap
+        row filters narrow the images before any per-image tag subquery.
+        """
+        terms = sorted(terms, key=_and_term_cost)
+        where_parts: list[str] = []
+        params: list[Any] = []
+        for term in terms:
+            where, term_params = self._node_to_sql(term)
+            where_parts.append(where)
+            params.extend(term_params)
+        return f"({' AND '.join(where_parts)})", params
+
+    def _or_chain_to_sql(self, terms: list[ASTNode]) -> tuple[str, list[Any]]:
+        """Convert the operands of an OR chain to SQL.
+
+        Equality tests on the same tag path are fused into one ``IN``
+        predicate, so ``tag.person=="Alice" || tag.person=="Bob"`` costs a
+        single tag subquery (or column test) rather than one per value.
+        """
+        equal_values: dict[str, list[Any]] = {}
+        for term in terms:
+            if isinstance(term, ComparisonNode) and term.operator == "==":
+                equal_values.setdefault(term.tag_path, []).append(term.value)
+
+        where_parts: list[str] = []
+        params: list[Any] = []
+        fused: set[str] = set()
+        for term in terms:
+            if (
+                isinstance(term, ComparisonNode)
+                and term.operator == "=="
+                and len(equal_values[term.tag_path]) > 1
+            ):
+                if term.tag_path in fused:
+                    continue
+                fused.add(term.tag_path)
+                values = equal_values[term.tag_path]
+                placeholders = ", ".join("?" * len(values))
+                where, term_params = self._predicate_to_sql(
+                    term.tag_path, f"IN ({placeholders})", values
+                )
+            else:
+                where, term_params = self._node_to_sql(term)
+            where_parts.append(where)
+            params.extend(term_params)
+
+        if len(where_parts) == 1:
+            return where_parts[0], params
+        return f"({' OR '.join(where_parts)})", params
+
+    def _comparison_to_sql(self, node: ComparisonNode) -> tuple[str, list[Any]]:
         """Convert a comparison node to SQL."""
-        tag_path = node.tag_path
         sql_op = SQL_OPERATORS.get(node.operator)
         if sql_op is None:
             raise ValueError(f"Unknown operator: {node.operator}")
+        return self._predicate_to_sql(node.tag_path, f"{sql_op} ?", [node.value])
 
+    def _predicate_to_sql(
+        self, tag_path: str, condition: str, values: list[Any]
+    ) -> tuple[str, list[Any]]:
+        """SQL testing a tag path's value against ``condition``.
+
+        ``condition`` is the operator and placeholder(s), e.g. ``"= ?"`` or
+        ``"IN (?, ?)"``, filled from ``values``.
+        """
         # Check if this maps to a fixed column
         if tag_path in FIXED_FIELD_MAP:
             column = FIXED_FIELD_MAP[tag_path]
-            value = self._convert_value(node.value, column)
-            where = f"i.{column} {sql_op} ?"
-            return where, [value], []
+            where = f"i.{column} {condition}"
+            return where, [self._convert_value(v, column) for v in values]
 
-        # Dynamic tag query - need to join to image_tags and tag_definitions
+        # Dynamic tag query - a correlated EXISTS over image_tags, so each
+        # image is matched at most once and no DISTINCT is needed. The tag
+        # path is resolved to IDs up front rather than joined by name.
+        tag_ids = self._db.find_tag_ids(tag_path)
+        if not tag_ids:
+            return "0", []
         self._join_counter += 1
-        alias_it = f"it{self._join_counter}"
-        alias_td = f"td{self._join_counter}"
-
-        # Resolve the tag path to find the tag definition
-        # The tag_path could be like "person", "event.birthday", "scene.outdoor"
-        parts = tag_path.split(".")
-
-        joins = [
-            f"JOIN image_tags {alias_it} ON i.id = {alias_it}.image_id",
-            f"JOIN tag_definitions {alias_td} ON {alias_it}.tag_id = {alias_td}.id",
-        ]
-
-        if len(parts) == 1:
-            # Simple tag: tag.person == "Alice"
-            # Match tag name, compare value
-            where = f"({alias_td}.name = ? AND {alias_it}.value {sql_op} ?)"
-            params = [parts[0], str(node.value)]
-        elif len(parts) == 2:
-            # Nested tag: tag.event.birthday or tag.scene.outdoor
-            # Could be: parent_name.child_name == value
-            # We need to match the child tag under the parent
-            self._join_counter += 1
-            alias_parent = f"td{self._join_counter}"
-            joins.append(
-                f"JOIN tag_definitions {alias_parent} "
-                f"ON {alias_td}.parent_id = {alias_parent}.id"
-            )
-            where = (
-                f"({alias_parent}.name = ? AND {alias_td}.name = ? "
-                f"AND {alias_it}.value {sql_op} ?)"
-            )
-            params = [parts[0], parts[1], str(node.value)]
-        else:
-            # Deeper nesting - build a chain of parent joins
-            # For now, handle up to 3 levels
-            where_parts = [f"{alias_td}.name = ?"]
-            params = [parts[-1]]
-
-            current_alias = alias_td
-            for i in range(len(parts) - 2, -1, -1):
-                self._join_counter += 1
-                parent_alias = f"td{self._join_counter}"
-                joins.append(
-                    f"JOIN tag_definitions {parent_alias} "
-                    f"ON {current_alias}.parent_id = {parent_alias}.id"
-                )
-                where_parts.append(f"{parent_alias}.name = ?")
-                params.append(parts[i])
-                current_alias = parent_alias
-
-            where_parts.append(f"{alias_it}.value {sql_op} ?")
-            params.append(str(node.value))
-            where = f"({' AND '.join(where_parts)})"
-
-        return where, params, joins
+        alias = f"it{self._join_counter}"
+        id_placeholders = ", ".join("?" * len(tag_ids))
+        where = (
+            f"EXISTS (SELECT 1 FROM image_tags {alias} "
+            f"WHERE {alias}.image_id = i.id "
+            f"AND {alias}.tag_id IN ({id_placeholders}) "
+            f"AND {alias}.value {condition})"
+        )
+        return where, [*tag_ids, *(str(v) for v in values)]
 
     def _convert_value(self, value: Any, column: str) -> Any:
         """Convert a query value to the appropriate type for a column."""
-        bool_columns = {
-            "favorite", "to_delete", "reviewed",
-            "auto_tag_errors", "has_lat_lon",
-        }
-        int_columns = {
-            "year", "month", "day", "hour", "minute", "second",
-            "width", "height",
-        }
-        if column in bool_columns:
+        if column in BOOL_COLUMNS:
             if isinstance(value, bool):
                 return int(value)
             if isinstance(value, str):
                 return 1 if value.lower() in ("true", "1", "yes") else 0
             return int(bool(value))
-        if column in int_columns:
+        if column in INT_COLUMNS:
             return int(value)
         return value
+
+
+def _and_term_cost(node: ASTNode) -> int:
+    """Rough cost rank of an AND operand; lower ranks are emitted first.
+
+    Equality on an indexed column can drive an index search, other column
+    tests are per-row checks, tag tests each run a subquery, and nested OR
+    chains may run several.
+    """
+    if isinstance(node, ComparisonNode):
+        column = FIXED_FIELD_MAP.get(node.tag_path)
+        if column is None:
+            return 3 if node.operator == "==" else 4
+        if node.operator == "==":
+            return 0 if column in INDEXED_COLUMNS else 1
+        return 2
+    return 5
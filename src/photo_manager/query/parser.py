@@ -18,9 +18,11 @@ Grammar:
 
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass
+from functools import lru_cache
 from enum import Enum, auto
-from typing import Any
+from typing import Any, Callable, Hashable
 
 
 class TokenType(Enum):
@@ -48,128 +50,88 @@ class Token:
     pos: int
 
 
+def _number(text: str) -> int | float:
+    return float(text) if "." in text else int(text)
+
+
+# One alternative per token kind, tried in order at each position; two-char
+# operators come before their one-char prefixes
+_TOKEN_RE = re.compile(r"""
+    (?P<LPAREN>\()
+  | (?P<RPAREN>\))
+  | (?P<OP_AND>&&)
+  | (?P<OP_OR>\|\|)
+  | (?P<OP_EQ>==)
+  | (?P<OP_NEQ>!=)
+  | (?P<OP_GTE>>=)
+  | (?P<OP_LTE><=)
+  | (?P<OP_GT>>)
+  | (?P<OP_LT><)
+  | (?P<STRING>"[^"]*"|'[^']*')
+  | (?P<TAG_REF>tag\.[\w.]*)
+  | (?P<TRUE>true)
+  | (?P<FALSE>false)
+  | (?P<NUMBER>-?\d+(?:\.\d*)?)
+""", re.VERBOSE)
+
+_WHITESPACE_RE = re.compile(r"\s*")
+
+# Matched group name -> (token type, token value from the matched text)
+_TOKEN_KINDS: dict[str, tuple[TokenType, Callable[[str], Any]]] = {
+    "LPAREN": (TokenType.LPAREN, str),
+    "RPAREN": (TokenType.RPAREN, str),
+    "OP_AND": (TokenType.OP_AND, str),
+    "OP_OR": (TokenType.OP_OR, str),
+    "OP_EQ": (TokenType.OP_EQ, str),
+    "OP_NEQ": (TokenType.OP_NEQ, str),
+    "OP_GTE": (TokenType.OP_GTE, str),
+    "OP_LTE": (TokenType.OP_LTE, str),
+    "OP_GT": (TokenType.OP_GT, str),
+    "OP_LT": (TokenType.OP_LT, str),
+    "STRING": (TokenType.STRING, lambda text: text[1:-1]),
+    "TAG_REF": (TokenType.TAG_REF, lambda text: text[4:]),  # drop 'tag.'
+    "TRUE": (TokenType.BOOLEAN, lambda text: True),
+    "FALSE": (TokenType.BOOLEAN, lambda text: False),
+    "NUMBER": (TokenType.NUMBER, _number),
+}
+
+
 class Tokenizer:
-    """Tokenize a query expression string."""
+    """Tokenize a query expression string.
+
+    Each token is found with one match of _TOKEN_RE and dispatched on the
+    name of the group that matched, rather than by testing characters.
+    """
 
     def __init__(self, text: str):
         self._text = text
-        self._pos = 0
 
     def tokenize(self) -> list[Token]:
+        text = self._text
         tokens: list[Token] = []
-        while self._pos < len(self._text):
-            self._skip_whitespace()
-            if self._pos >= len(self._text):
-                break
-
-            ch = self._text[self._pos]
-
-            if ch == "(":
-                tokens.append(Token(TokenType.LPAREN, "(", self._pos))
-                self._pos += 1
-            elif ch == ")":
-                tokens.append(Token(TokenType.RPAREN, ")", self._pos))
-                self._pos += 1
-            elif ch == "&" and self._peek(1) == "&":
-                tokens.append(Token(TokenType.OP_AND, "&&", self._pos))
-                self._pos += 2
-            elif ch == "|" and self._peek(1) == "|":
-                tokens.append(Token(TokenType.OP_OR, "||", self._pos))
-                self._pos += 2
-            elif ch == "=" and self._peek(1) == "=":
-                tokens.append(Token(TokenType.OP_EQ, "==", self._pos))
-                self._pos += 2
-            elif ch == "!" and self._peek(1) == "=":
-                tokens.append(Token(TokenType.OP_NEQ, "!=", self._pos))
-                self._pos += 2
-            elif ch == ">" and self._peek(1) == "=":
-                tokens.append(Token(TokenType.OP_GTE, ">=", self._pos))
-                self._pos += 2
-            elif ch == "<" and self._peek(1) == "=":
-                tokens.append(Token(TokenType.OP_LTE, "<=", self._pos))
-                self._pos += 2
-            elif ch == ">":
-                tokens.append(Token(TokenType.OP_GT, ">", self._pos))
-                self._pos += 1
-            elif ch == "<":
-                tokens.append(Token(TokenType.OP_LT, "<", self._pos))
-                self._pos += 1
-            elif ch in ('"', "'"):
-                tokens.append(self._read_string(ch))
-            elif ch == "t" and self._text[self._pos:self._pos + 4] == "tag.":
-                tokens.append(self._read_tag_ref())
-            elif ch == "t" and self._text[self._pos:self._pos + 4] == "true":
-                tokens.append(Token(TokenType.BOOLEAN, True, self._pos))
-                self._pos += 4
-            elif ch == "f" and self._text[self._pos:self._pos + 5] == "false":
-                tokens.append(Token(TokenType.BOOLEAN, False, self._pos))
-                self._pos += 5
-            elif ch.isdigit() or (ch == "-" and self._pos + 1 < len(self._text) and self._text[self._pos + 1].isdigit()):
-                tokens.append(self._read_number())
-            else:
+        pos = _WHITESPACE_RE.match(text).end()
+        while pos < len(text):
+            match = _TOKEN_RE.match(text, pos)
+            if match is None:
+                ch = text[pos]
+                if ch in ('"', "'"):
+                    raise QueryParseError(f"Unterminated string at position {pos}")
                 raise QueryParseError(
-                    f"Unexpected character '{ch}' at position {self._pos}"
+                    f"Unexpected character '{ch}' at position {pos}"
                 )
+            kind = match.lastgroup
+            token_type, convert = _TOKEN_KINDS[kind]
+            tokens.append(Token(token_type, convert(match.group(kind)), pos))
+            pos = _WHITESPACE_RE.match(text, match.end()).end()
 
-        tokens.append(Token(TokenType.EOF, None, self._pos))
+        tokens.append(Token(TokenType.EOF, None, pos))
         return tokens
 
-    def _peek(self, offset: int) -> str:
-        pos = self._pos + offset
-        return self._text[pos] if pos < len(self._text) else ""
-
-    def _skip_whitespace(self) -> None:
-        while self._pos < len(self._text) and self._text[self._pos].isspace():
-            self._pos += 1
-
-    def _read_string(self, quote: str) -> Token:
-        start = self._pos
-        self._pos += 1  # skip opening quote
-        chars: list[str] = []
-        while self._pos < len(self._text) and self._text[self._pos] != quote:
-            chars.append(self._text[self._pos])
-            self._pos += 1
-        if self._pos >= len(self._text):
-            raise QueryParseError(f"Unterminated string at position {start}")
-        self._pos += 1  # skip closing quote
-        return Token(TokenType.STRING, "".join(chars), start)
-
-    def _read_tag_ref(self) -> Token:
-        start = self._pos
-        self._pos += 4  # skip 'tag.'
-        chars: list[str] = []
-        while self._pos < len(self._text) and (
-            self._text[self._pos].isalnum()
-            or self._text[self._pos] in (".", "_")
-        ):
-            chars.append(self._text[self._pos])
-            self._pos += 1
-        return Token(TokenType.TAG_REF, "".join(chars), start)
-
-    def _read_number(self) -> Token:
-        start = self._pos
-        chars: list[str] = []
-        if self._text[self._pos] == "-":
-            chars.append("-")
-            self._pos += 1
-        has_dot = False
-        while self._pos < len(self._text) and (
-            self._text[self._pos].isdigit() or self._text[self._pos] == "."
-        ):
-            if self._text[self._pos] == ".":
-                if has_dot:
-                    break
-                has_dot = True
-            chars.append(self._text[self._pos])
-            self._pos += 1
-        value_str = "".join(chars)
-        value: int | float = float(value_str) if has_dot else int(value_str)
-        return Token(TokenType.NUMBER, value, start)
-
 
 # --- AST Nodes ---
+# Frozen so parsed trees can be cached and shared between callers
 
-@dataclass
+@dataclass(frozen=True)
 class ComparisonNode:
     """A comparison like tag.person == "Alice"."""
     tag_path: str       # e.g. "person", "datetime.year", "scene.outdoor"
@@ -177,7 +139,7 @@ class ComparisonNode:
     value: Any          # string, number, or boolean
 
 
-@dataclass
+@dataclass(frozen=True)
 class LogicalNode:
     """A logical combination of expressions."""
     operator: str       # "&&" or "||"
@@ -188,6 +150,17 @@ class LogicalNode:
 ASTNode = ComparisonNode | LogicalNode
 
 
+def ast_key(node: ASTNode) -> Hashable:
+    """Hashable structural key for an AST that also tells value types apart.
+
+    Node equality alone treats true, 1 and 1.0 as the same value, but they
+    compile to different tag-value strings.
+    """
+    if isinstance(node, LogicalNode):
+        return (node.operator, ast_key(node.left), ast_key(node.right))
+    return (node.tag_path, node.operator, type(node.value), node.value)
+
+
 class QueryParseError(Exception):
     """Error raised when parsing a query expression fails."""
     pass
@@ -288,9 +261,13 @@ class Parser:
         return token
 
 
+@lru_cache(maxsize=256)
 def parse_query(expression: str) -> ASTNode:
     """Parse a query expression string into an AST.
 
+    Results are cached per expression string; the AST is immutable, so a
+    cached tree is safe to share.
+
     Example:
         ast = parse_query('tag.person=="Alice" && tag.datetime.year>=2018')
     """
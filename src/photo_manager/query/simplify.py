@@ -0,0 +1,118 @@
+"""Boolean simplification of parsed query ASTs before SQL generation.
+
+Removes predicates that cannot change the result, e.g.:
+    tag.favorite==true && tag.favorite==true   ->  tag.favorite==true
+    tag.datetime.year>=2019 && tag.datetime.year>=2018
+                                               ->  tag.datetime.year>=2019
+    tag.datetime.year==2020 || tag.datetime.year>=2019
+                                               ->  tag.datetime.year>=2019
+"""
+
+from __future__ import annotations
+
+from typing import Collection, Hashable
+
+from photo_manager.query.parser import (
+    ASTNode,
+    ComparisonNode,
+    LogicalNode,
+    ast_key,
+)
+
+_BOUND_OPERATORS = {"==", ">", ">=", "<", "<="}
+
+
+def simplify(node: ASTNode, numeric_paths: Collection[str] = ()) -> ASTNode:
+    """Return an equivalent AST with duplicate and subsumed terms removed.
+
+    Chains of the same logical operator are flattened and structurally
+    identical terms dropped. For tag paths in ``numeric_paths`` (integer
+    columns), comparisons against integers are also checked for
+    implication: in an AND the weaker term goes, in an OR the stronger.
+    Other paths are left alone, since their values compare as text.
+    """
+    if isinstance(node, ComparisonNode):
+        return node
+
+    terms: list[ASTNode] = []
+    seen: set[Hashable] = set()
+    for term in flatten(node, node.operator):
+        term = simplify(term, numeric_paths)
+        key = ast_key(term)
+        if key not in seen:
+            seen.add(key)
+            terms.append(term)
+
+    terms = _drop_implied(terms, node.operator, numeric_paths)
+    result = terms[0]
+    for term in terms[1:]:
+        result = LogicalNode(operator=node.operator, left=result, right=term)
+    return result
+
+
+def flatten(node: ASTNode, operator: str) -> list[ASTNode]:
+    """Operands of a left/right-nested chain of one logical operator."""
+    if isinstance(node, LogicalNode) and node.operator == operator:
+        return flatten(node.left, operator) + flatten(node.right, operator)
+    return [node]
+
+
+def _drop_implied(
+    terms: list[ASTNode], operator: str, numeric_paths: Collection[str]
+) -> list[ASTNode]:
+    """Drop terms made redundant by another term of the same chain."""
+    bounds = [_integer_bound(t, numeric_paths) for t in terms]
+    kept = []
+    for i, term in enumerate(terms):
+        redundant = False
+        if bounds[i] is not None:
+            for j, other in enumerate(bounds):
+                if j == i or other is None or other[0] != bounds[i][0]:
+                    continue
+                # AND keeps the stronger term, OR the weaker one
+                stronger, weaker = (
+                    (other, bounds[i]) if operator == "&&" else (bounds[i], other)
+                )
+                if _implies(stronger, weaker) and (
+                    not _implies(weaker, stronger) or j < i
+                ):
+                    redundant = True
+                    break
+        if not redundant:
+            kept.append(term)
+    return kept
+
+
+def _integer_bound(
+    node: ASTNode, numeric_paths: Collection[str]
+) -> tuple[str, str, int] | None:
+    """(tag_path, operator, value) for an integer comparison, else None.
+
+    Strict bounds are normalized: x > a becomes x >= a + 1.
+    """
+    if not (
+        isinstance(node, ComparisonNode)
+        and node.tag_path in numeric_paths
+        and node.operator in _BOUND_OPERATORS
+        and type(node.value) is int
+    ):
+        return None
+    if node.operator == ">":
+        return node.tag_path, ">=", node.value + 1
+    if node.operator == "<":
+        return node.tag_path, "<=", node.value - 1
+    return node.tag_path, node.operator, node.value
+
+
+def _implies(p: tuple[str, str, int], q: tuple[str, str, int]) -> bool:
+    """Whether every value satisfying bound p also satisfies bound q."""
+    _, p_op, a = p
+    _, q_op, b = q
+    if p_op == "==":
+        return (
+            a == b if q_op == "=="
+            else a >= b if q_op == ">="
+            else a <= b
+        )
+    return p_op == q_op and (a >= b if p_op == ">=" else a <= b)
+
@@ -41,42 +41,34 @@ def parse_datetime(
     return None
 
 
-# Patterns ordered from most specific to least specific
-_FILENAME_PATTERNS: list[tuple[str, str]] = [
+# Patterns ordered from most specific to least specific, compiled once
+# since every scanned file without EXIF dates goes through them
+_FILENAME_PATTERNS: list[re.Pattern[str]] = [
     # 2019-07-04_15-30-24 or 2019-07-04_15:30:24
-    (r"(\d{4})-(\d{2})-(\d{2})[_\s](\d{2})[-:](\d{2})[-:](\d{2})",
-     "%Y-%m-%d_%H-%M-%S"),
+    re.compile(r"(\d{4})-(\d{2})-(\d{2})[_\s](\d{2})[-:](\d{2})[-:](\d{2})"),
     # 20190704_153024 (common camera format)
-    (r"(\d{4})(\d{2})(\d{2})[_\s-](\d{2})(\d{2})(\d{2})",
-     "%Y%m%d_%H%M%S"),
+    re.compile(r"(\d{4})(\d{2})(\d{2})[_\s-](\d{2})(\d{2})(\d{2})"),
     # IMG_20190704_153024
-    (r"IMG[_-](\d{4})(\d{2})(\d{2})[_-](\d{2})(\d{2})(\d{2})",
-     "%Y%m%d_%H%M%S"),
+    re.compile(r"IMG[_-](\d{4})(\d{2})(\d{2})[_-](\d{2})(\d{2})(\d{2})"),
     # 2019-07-04
-    (r"(\d{4})-(\d{2})-(\d{2})", "%Y-%m-%d"),
+    re.compile(r"(\d{4})-(\d{2})-(\d{2})"),
     # 20190704
-    (r"(\d{4})(\d{2})(\d{2})", "%Y%m%d"),
+    re.compile(r"(\d{4})(\d{2})(\d{2})"),
 ]
 
+# A folder named after a year, 1900-2099
+_YEAR_DIR_RE = re.compile(r"^((?:19|20)\d{2})$")
+
 
 def _parse_from_filename(filename: str) -> datetime | None:
     """Try to extract a datetime from the filename."""
     stem = Path(filename).stem
 
-    for pattern, fmt in _FILENAME_PATTERNS:
-        match = re.search(pattern, stem)
+    for pattern in _FILENAME_PATTERNS:
+        match = pattern.search(stem)
         if match:
-            groups = match.groups()
             try:
-                if len(groups) == 6:
-                    return datetime(
-                        int(groups[0]), int(groups[1]), int(groups[2]),
-                        int(groups[3]), int(groups[4]), int(groups[5]),
-                    )
-                elif len(groups) == 3:
-                    return datetime(
-                        int(groups[0]), int(groups[1]), int(groups[2]),
-                    )
+                return datetime(*map(int, match.groups()))
             except ValueError:
                 continue
     return None
@@ -89,7 +81,7 @@ def _parse_from_path(filepath: Path) -> datetime | None:
     """
     parts = filepath.parts
     for part in reversed(parts):
-        match = re.match(r"^((?:19|20)\d{2})$", part)
+        match = _YEAR_DIR_RE.match(part)
         if match:
             try:
                 year = int(match.group(1))
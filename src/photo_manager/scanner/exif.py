@@ -94,9 +94,18 @@ def extract_exif(filepath: str | Path) -> ExifData:
     return result
 
 
-def get_oriented_image(filepath: str | Path) -> Image.Image:
-    """Open an image and apply EXIF orientation correction."""
+def get_oriented_image(
+    filepath: str | Path, draft_size: tuple[int, int] | None = None
+) -> Image.Image:
+    """Open an image and apply EXIF orientation correction.
+
+    With ``draft_size``, JPEGs are decoded at the smallest DCT scale
+    (1/2, 1/4 or 1/8) that is still at least that size, which is far
+    cheaper than a full decode. Other formats ignore it.
+    """
     img = Image.open(filepath)
+    if draft_size is not None:
+        img.draft(None, draft_size)
     exif_raw = img.getexif()
     if exif_raw:
         orientation = exif_raw.get(0x0112)  # Orientation tag
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import logging
 import os
+from concurrent.futures import Executor, ThreadPoolExecutor
 from pathlib import Path
 from typing import Callable
 
@@ -16,8 +17,8 @@ from photo_manager.scanner.datetime_parser import parse_datetime
 from photo_manager.scanner.exif import extract_exif
 from photo_manager.scanner.tag_template import (
     TagTemplate,
+    TemplateMatcher,
     load_template_file,
-    match_filepath,
     validate_template,
 )
 
@@ -26,6 +27,9 @@ logger = logging.getLogger(__name__)
 # Callback signature: (current_count, total_count, filepath)
 ProgressCallback = Callable[[int, int, str], None]
 
+# Files whose metadata is read in parallel and inserted in one transaction
+SCAN_BATCH_SIZE = 256
+
 
 class DirectoryScanner:
     """Recursively scan directories for images and add them to the database."""
@@ -34,9 +38,11 @@ class DirectoryScanner:
         self,
         db: DatabaseManager,
         config: ConfigManager | None = None,
+        max_workers: int = 4,
     ):
         self._db = db
         self._config = config
+        self._max_workers = max_workers
         self._supported_formats = self._get_supported_formats()
         self._ignore_patterns = self._get_ignore_patterns()
         self._max_file_size = self._get_max_file_size()
@@ -81,98 +87,171 @@ class DirectoryScanner:
         image_files = self._find_image_files(directory, recursive)
         result = ScanResult(total_found=len(image_files))
 
-        # Process each file
+        # Read metadata in parallel a batch at a time; insert each batch at once
         db_dir = self._db.db_path.parent.resolve() if self._db.db_path else directory
-        for i, filepath in enumerate(image_files):
-            if progress_callback:
-                progress_callback(i + 1, len(image_files), str(filepath))
-            try:
-                # Compute relative path from DB location
-                try:
-                    rel_path = filepath.relative_to(db_dir)
-                except ValueError:
-                    rel_path = filepath
-                rel_path_str = str(rel_path).replace("\\", "/")
-
-                # Skip if already in database
-                existing = self._db.get_image_by_path(rel_path_str)
-                if existing:
-                    result.skipped += 1
-                    continue
+        matcher = TemplateMatcher(templates)
+        with ThreadPoolExecutor(max_workers=self._max_workers) as pool:
+            for start in range(0, len(image_files), SCAN_BATCH_SIZE):
+                self._scan_batch(
+                    image_files[start:start + SCAN_BATCH_SIZE], start,
+                    db_dir, matcher, pool, result, progress_callback,
+                )
 
-                # Extract metadata
-                image_record = self._process_image(filepath, rel_path_str)
+        return result
+
+    def _scan_batch(
+        self,
+        batch: list[Path],
+        start: int,
+        db_dir: Path,
+        matcher: TemplateMatcher,
+        pool: Executor,
+        result: ScanResult,
+        progress_callback: ProgressCallback | None,
+    ) -> None:
+        """Add one batch of image files to the database, updating result."""
+        # Relative path per file, or None if it is already in the database
+        rel_paths: list[str | None] = []
+        pending: list[tuple[Path, str]] = []
+        for filepath in batch:
+            # Compute relative path from DB location
+            try:
+                rel_path = filepath.relative_to(db_dir)
+            except ValueError:
+                rel_path = filepath
+            rel_path_str = str(rel_path).replace("\\", "/")
+
+            # Skip if already in database
+            if self._db.get_image_by_path(rel_path_str):
+                rel_paths.append(None)
+            else:
+                rel_paths.append(rel_path_str)
+                pending.append((filepath, rel_path_str))
+
+        # Extract metadata, reporting progress as each file is handled
+        records = pool.map(lambda item: self._process_image(*item), pending)
+        new_images: list[tuple[Path, ImageRecord]] = []
+        for i, (filepath, rel_path_str) in enumerate(zip(batch, rel_paths), start + 1):
+            if rel_path_str is None:
+                result.skipped += 1
+            else:
+                image_record = next(records)
                 if image_record is None:
                     result.errors += 1
                     result.error_files.append(str(filepath))
-                    continue
-
-                # Add to database
-                image_id = self._db.add_image(image_record)
-
-                # Apply tag templates
-                if templates:
-                    tag_values = match_filepath(rel_path_str, templates)
-                    for tag_path, value in tag_values.items():
-                        tag_def = self._db.resolve_tag_path(tag_path)
-                        if tag_def:
-                            self._db.set_image_tag(image_id, tag_def.id, value)
-
-                result.added += 1
+                else:
+                    new_images.append((filepath, image_record))
+            if progress_callback:
+                progress_callback(i, result.total_found, str(filepath))
+        if not new_images:
+            return
 
-            except Exception as e:
-                logger.error(f"Error processing {filepath}: {e}")
-                result.errors += 1
-                result.error_files.append(str(filepath))
+        # Add to database; if the batch insert fails, retry one file at a
+        # time so a single bad record does not cost the whole batch
+        try:
+            image_ids = self._db.add_images_bulk([r for _, r in new_images])
+        except Exception as e:
+            logger.error(
+                f"Error adding {len(new_images)} images, retrying one by one: {e}"
+            )
+            added: list[tuple[Path, ImageRecord]] = []
+            image_ids = []
+            for filepath, image_record in new_images:
+                try:
+                    image_ids.append(self._db.add_image(image_record))
+                except Exception as e:
+                    logger.error(f"Error adding {filepath}: {e}")
+                    result.errors += 1
+                    result.error_files.append(str(filepath))
+                else:
+                    added.append((filepath, image_record))
+            new_images = added
+
+        # Apply tag templates
+        tags: list[tuple[int, int, str]] = []
+        for (_, image_record), image_id in zip(new_images, image_ids):
+            tag_values = matcher.match(image_record.filepath)
+            for tag_path, value in tag_values.items():
+                tag_def = self._db.resolve_tag_path(tag_path)
+                if tag_def:
+                    tags.append((image_id, tag_def.id, value))
+        try:
+            self._db.set_image_tags_bulk(tags)
+        except Exception as e:
+            logger.error(f"Error tagging {len(new_images)} images: {e}")
+            result.errors += len(new_images)
+            result.error_files.extend(str(f) for f, _ in new_images)
+            return
 
-        return result
+        result.added += len(new_images)
 
     def _find_image_files(
         self, directory: Path, recursive: bool
     ) -> list[Path]:
-        """Find all image files in a directory."""
-        image_files: list[Path] = []
-
-        if recursive:
-            walker = os.walk(directory)
-        else:
-            walker = [(str(directory), [], os.listdir(directory))]
-
-        for root_str, dirs, files in walker:
-            root = Path(root_str)
-
-            # Filter hidden directories
-            if self._ignore_hidden:
-                dirs[:] = [d for d in dirs if not d.startswith(".")]
-
-            for filename in sorted(files):
-                # Skip hidden files
-                if self._ignore_hidden and filename.startswith("."):
-                    continue
-
-                # Skip ignore patterns
-                if any(filename == p for p in self._ignore_patterns):
-                    continue
+        """Find all image files in a directory.
 
-                # Check extension
-                ext = Path(filename).suffix.lower().lstrip(".")
-                if ext not in self._supported_formats:
-                    continue
+        Files come in os.walk's top-down order: each directory's files
+        sorted by name, then its subdirectories.
+        """
+        image_files: list[Path] = []
+        self._collect_image_files(str(directory), recursive, image_files)
+        return image_files
 
-                filepath = root / filename
+    def _collect_image_files(
+        self, directory: str, recursive: bool, image_files: list[Path]
+    ) -> None:
+        """Append a directory's image files, then its subdirectories' files.
 
-                # Check file size
-                if self._max_file_size > 0:
-                    try:
-                        size = filepath.stat().st_size
-                        if size > self._max_file_size:
-                            continue
-                    except OSError:
+        Walks with os.scandir so file type and size come from the directory
+        entry rather than separate stat calls where the OS provides them.
+        """
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            return
+
+        subdirs: list[str] = []
+        root = Path(directory)
+        for entry in sorted(entries, key=lambda e: e.name):
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                # Filter hidden directories; like os.walk, don't follow links
+                if recursive and not entry.is_symlink() and not (
+                    self._ignore_hidden and entry.name.startswith(".")
+                ):
+                    subdirs.append(entry.path)
+                continue
+
+            filename = entry.name
+            # Skip hidden files
+            if self._ignore_hidden and filename.startswith("."):
+                continue
+
+            # Skip ignore patterns
+            if any(filename == p for p in self._ignore_patterns):
+                continue
+
+            # Check extension
+            ext = os.path.splitext(filename)[1].lower().lstrip(".")
+            if ext not in self._supported_formats:
+                continue
+
+            # Check file size
+            if self._max_file_size > 0:
+                try:
+                    if entry.stat().st_size > self._max_file_size:
                         continue
+                except OSError:
+                    continue
 
-                image_files.append(filepath)
+            image_files.append(root / filename)
 
-        return image_files
+        for subdir in subdirs:
+            self._collect_image_files(subdir, recursive, image_files)
 
     def _process_image(
         self, filepath: Path, rel_path: str
@@ -13,13 +13,16 @@ Examples:
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import PurePosixPath
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from photo_manager.db.manager import DatabaseManager
 
+# A capture segment: {tag.path}, optionally followed by .* on the filename
+_CAPTURE_RE = re.compile(r"^\{([^}]+)\}(\.\*)?$")
+
 
 @dataclass
 class TemplateSegment:
@@ -35,54 +38,86 @@ class TagTemplate:
 
     raw_template: str
     segments: list[TemplateSegment]
-
-    def match(self, filepath: str) -> dict[str, str] | None:
-        """Match a filepath against this template.
-
-        Returns a dict of {tag_path: value} if the filepath matches,
-        or None if it doesn't match.
-        """
-        # Normalize the filepath to use forward slashes
-        filepath = filepath.replace("\\", "/")
-        # Strip leading ./ if present
-        if filepath.startswith("./"):
-            filepath = filepath[2:]
-
-        parts = PurePosixPath(filepath).parts
-
+    # Derived from segments once, since match() runs for every scanned file
+    _dir_count: int = field(init=False, repr=False, compare=False)
+    _dir_captures: tuple[tuple[int, str], ...] = field(
+        init=False, repr=False, compare=False
+    )
+    _file_tag_path: str | None = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
         # Non-filename segments match directories, last segment matches filename
         dir_segments = [s for s in self.segments if not s.is_filename]
         file_segment = next(
             (s for s in self.segments if s.is_filename), None
         )
+        self._dir_count = len(dir_segments)
+        self._dir_captures = tuple(
+            (i, seg.tag_path)
+            for i, seg in enumerate(dir_segments)
+            if seg.tag_path is not None
+        )
+        self._file_tag_path = file_segment.tag_path if file_segment else None
 
-        # Split filepath into dir parts and filename
-        if len(parts) < 1:
-            return None
+    def match(self, filepath: str) -> dict[str, str] | None:
+        """Match a filepath against this template.
 
-        filepath_dirs = parts[:-1]
-        filepath_filename = parts[-1]
+        Returns a dict of {tag_path: value} if the filepath matches,
+        or None if it doesn't match.
+        """
+        return self._match_parts(_path_parts(filepath))
 
-        # Check directory segment count matches
-        if len(filepath_dirs) != len(dir_segments):
+    def _match_parts(self, parts: tuple[str, ...]) -> dict[str, str] | None:
+        """Match the components of a normalized filepath."""
+        # Split filepath into dir parts and filename; the directory
+        # segment count must match
+        if len(parts) - 1 != self._dir_count:
             return None
 
-        result: dict[str, str] = {}
-
         # Match directory segments
-        for seg, dir_part in zip(dir_segments, filepath_dirs):
-            if seg.tag_path is not None:
-                result[seg.tag_path] = dir_part
+        result = {tag_path: parts[i] for i, tag_path in self._dir_captures}
 
         # Match filename segment
-        if file_segment is not None and file_segment.tag_path is not None:
+        if self._file_tag_path is not None:
             # Strip extension for capture
-            name_without_ext = PurePosixPath(filepath_filename).stem
-            result[file_segment.tag_path] = name_without_ext
+            result[self._file_tag_path] = PurePosixPath(parts[-1]).stem
 
         return result
 
 
+class TemplateMatcher:
+    """Match filepaths against a list of templates; the first match wins.
+
+    Templates capture by position and treat literal segments as wildcards,
+    so whether one matches depends only on the path's directory depth.
+    The first template for each depth is looked up directly rather than
+    trying every template in turn.
+    """
+
+    def __init__(self, templates: list[TagTemplate]):
+        self._by_depth: dict[int, TagTemplate] = {}
+        for template in templates:
+            self._by_depth.setdefault(template._dir_count, template)
+
+    def match(self, filepath: str) -> dict[str, str]:
+        """Tag assignments from the first matching template, or {}."""
+        parts = _path_parts(filepath)
+        template = self._by_depth.get(len(parts) - 1)
+        if template is None:
+            return {}
+        return template._match_parts(parts)
+
+
+def _path_parts(filepath: str) -> tuple[str, ...]:
+    """Split a filepath into components, normalized for template matching."""
+    # Normalize the filepath to use forward slashes
+    filepath = filepath.replace("\\", "/")
+    # Strip leading ./ if present
+    if filepath.startswith("./"):
+        filepath = filepath[2:]
+    return PurePosixPath(filepath).parts
+
+
 def parse_template(template_str: str) -> TagTemplate:
     """Parse a template string into a TagTemplate.
 
@@ -109,7 +144,7 @@ def parse_template(template_str: str) -> TagTemplate:
             ))
         elif "{" in part:
             # Tag capture: extract tag path from {tag.path}
-            match = re.match(r"^\{([^}]+)\}(\.\*)?$", part)
+            match = _CAPTURE_RE.match(part)
             if match:
                 tag_path = match.group(1)
                 segments.append(TemplateSegment(
@@ -174,10 +209,7 @@ def match_filepath(
     """Try to match a filepath against a list of templates.
 
     Returns the tag assignments from the first matching template,
-    or an empty dict if no template matches.
+    or an empty dict if no template matches. Build a TemplateMatcher
+    once instead when matching many paths against the same templates.
     """
-    for template in templates:
-        result = template.match(filepath)
-        if result is not None:
-            return result
-    return {}
+    return TemplateMatcher(templates).match(filepath)
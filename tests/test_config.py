@@ -1,41 +1,47 @@
 """Tests for ConfigManager."""
 
-import tempfile
-from pathlib import Path
+import copy
 
 import pytest
 
-from photo_manager.config.config import ConfigManager, DEFAULT_CONFIG
+from photo_manager.config.config import ConfigManager
+
+
+@pytest.fixture(scope="module")
+def default_cm():
+    """A single defaults-only ConfigManager shared by read-only tests."""
+    return ConfigManager()
+
+
+@pytest.fixture
+def fresh_cm(default_cm):
+    """A private copy of the defaults for tests that mutate config."""
+    return copy.deepcopy(default_cm)
 
 
 class TestConfigManager:
-    def test_default_config(self):
-        cm = ConfigManager()
-        assert cm.get("ui.default_zoom") == "fit_to_canvas"
-        assert cm.get("database.path") == ".photo_manager.db"
-        assert cm.get("performance.preload_next_images") == 3
+    def test_default_config(self, default_cm):
+        assert default_cm.get("ui.default_zoom") == "fit_to_canvas"
+        assert default_cm.get("database.path") == ".photo_manager.db"
+        assert default_cm.get("performance.preload_next_images") == 3
 
-    def test_get_dotted_key(self):
-        cm = ConfigManager()
-        assert cm.get("slideshow.duration") == 5.0
-        assert cm.get("nonexistent.key") is None
-        assert cm.get("nonexistent.key", "fallback") == "fallback"
+    def test_get_dotted_key(self, default_cm):
+        assert default_cm.get("slideshow.duration") == 5.0
+        assert default_cm.get("nonexistent.key") is None
+        assert default_cm.get("nonexistent.key", "fallback") == "fallback"
 
-    def test_set_dotted_key(self):
-        cm = ConfigManager()
-        cm.set("ui.default_zoom", "fill_canvas")
-        assert cm.get("ui.default_zoom") == "fill_canvas"
+    def test_set_dotted_key(self, fresh_cm):
+        fresh_cm.set("ui.default_zoom", "fill_canvas")
+        assert fresh_cm.get("ui.default_zoom") == "fill_canvas"
 
-    def test_set_creates_nested_keys(self):
-        cm = ConfigManager()
-        cm.set("new.nested.key", "value")
-        assert cm.get("new.nested.key") == "value"
+    def test_set_creates_nested_keys(self, fresh_cm):
+        fresh_cm.set("new.nested.key", "value")
+        assert fresh_cm.get("new.nested.key") == "value"
 
-    def test_save_and_load(self, tmp_path):
+    def test_save_and_load(self, tmp_path, fresh_cm):
         config_path = tmp_path / "config.yaml"
-        cm = ConfigManager()
-        cm.set("ui.theme", "light")
-        cm.save(config_path)
+        fresh_cm.set("ui.theme", "light")
+        fresh_cm.save(config_path)
 
         cm2 = ConfigManager(config_path)
         assert cm2.get("ui.theme") == "light"
@@ -51,15 +57,31 @@ class TestConfigManager:
         assert cm.get("ui.default_zoom") == "fit_to_canvas"
         assert cm.get("database.path") == ".photo_manager.db"
 
-    def test_reset(self):
-        cm = ConfigManager()
-        cm.set("ui.theme", "light")
-        cm.reset()
-        assert cm.get("ui.theme") == "dark"
+    def test_load_sees_file_changes(self, tmp_path):
+        config_path = tmp_path / "config.yaml"
+        config_path.write_text("ui:\n  theme: light\n")
+        assert ConfigManager(config_path).get("ui.theme") == "light"
+
+        config_path.write_text("ui:\n  theme: solarized\n")
+        assert ConfigManager(config_path).get("ui.theme") == "solarized"
+
+    def test_cached_load_is_not_shared(self, tmp_path):
+        config_path = tmp_path / "config.yaml"
+        config_path.write_text("ui:\n  theme: light\n")
+        cm1 = ConfigManager(config_path)
+        cm1.config["ui"]["theme"] = "dark"
+        assert ConfigManager(config_path).get("ui.theme") == "light"
+
+        ConfigManager.clear_cache()
+        assert ConfigManager(config_path).get("ui.theme") == "light"
+
+    def test_reset(self, fresh_cm):
+        fresh_cm.set("ui.theme", "light")
+        fresh_cm.reset()
+        assert fresh_cm.get("ui.theme") == "dark"
 
-    def test_no_path_raises(self):
-        cm = ConfigManager()
+    def test_no_path_raises(self, default_cm):
         with pytest.raises(ValueError):
-            cm.load()
+            default_cm.load()
         with pytest.raises(ValueError):
-            cm.save()
+            default_cm.save()
@@ -1,25 +1,35 @@
 """Tests for DatabaseManager."""
 
+import sqlite3
+
 import pytest
 
-from photo_manager.db.manager import DatabaseManager
-from photo_manager.db.models import ImageRecord, TagDefinition, ImageTag
+from photo_manager.db.manager import MEMORY_DATABASE, DatabaseManager
+from photo_manager.db.models import ImageRecord, TagDefinition
+from photo_manager.db.schema import CURRENT_SCHEMA_VERSION, SCHEMA_V1
 
 
 @pytest.fixture
-def db(tmp_path):
-    """Create a fresh database for each test."""
-    db_path = tmp_path / "test.db"
+def db():
+    """Create a fresh in-memory database for each test."""
     manager = DatabaseManager()
-    manager.create_database(db_path)
+    manager.create_database(MEMORY_DATABASE)
     yield manager
     manager.close()
 
 
 class TestDatabaseCreation:
-    def test_create_database(self, db):
+    def test_create_database(self, tmp_path):
+        db = DatabaseManager()
+        db.create_database(tmp_path / "test.db")
         assert db.is_open
         assert db.db_path.exists()
+        db.close()
+
+    def test_create_in_memory_database(self, db):
+        assert db.is_open
+        assert db.db_path is None
+        assert db.get_image_count() == 0
 
     def test_default_tag_tree_seeded(self, db):
         tags = db.get_all_tag_definitions()
@@ -55,6 +65,18 @@ class TestDatabaseCreation:
         tag = db.resolve_tag_path("nonexistent.path")
         assert tag is None
 
+    def test_find_tag_ids(self, db):
+        alice = db.resolve_tag_path("event.birthday.Alice").id
+        assert db.find_tag_ids("event.birthday.Alice") == [alice]
+        assert alice in db.find_tag_ids("birthday.Alice")
+        assert db.find_tag_ids("day.Alice") == []
+        assert db.find_tag_ids("nonexistent.path") == []
+
+    def test_get_tag_path(self, db):
+        alice = db.resolve_tag_path("event.birthday.Alice")
+        assert db.get_tag_path(alice.id) == "event.birthday.Alice"
+        assert db.get_tag_path(99999) is None
+
     def test_open_existing_database(self, tmp_path):
         db_path = tmp_path / "test.db"
         db1 = DatabaseManager()
@@ -68,6 +90,35 @@ class TestDatabaseCreation:
         assert len(tags) > 0
         db2.close()
 
+    def test_open_migrates_v1_database(self, tmp_path):
+        db_path = tmp_path / "test.db"
+        db1 = DatabaseManager()
+        db1.create_database(db_path)
+        db1.close()
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("DROP TABLE hash_cache")
+            conn.execute("DROP INDEX idx_image_tags_tag_value")
+            conn.executescript(SCHEMA_V1)
+            conn.execute("DELETE FROM schema_version WHERE version > 1")
+        conn.close()
+
+        db2 = DatabaseManager()
+        db2.open_database(db_path)
+        db2.store_cached_hashes([((1, 2, 3, 4), ("a", "b", "c", "d"))])
+        assert db2.get_cached_hashes((1, 2, 3, 4)) == ("a", "b", "c", "d")
+        # Same inode on another device is a different file
+        assert db2.get_cached_hashes((9, 2, 3, 4)) is None
+        assert db2._get_schema_version() == CURRENT_SCHEMA_VERSION
+        indexes = {
+            row[0] for row in db2.execute_query(
+                "SELECT name FROM sqlite_master WHERE tbl_name = 'image_tags'"
+                " AND type = 'index'"
+            )
+        }
+        assert "idx_image_tags_tag_value" in indexes
+        assert "idx_image_tags_tag" not in indexes
+        db2.close()
+
     def test_open_nonexistent_raises(self, tmp_path):
         db = DatabaseManager()
         with pytest.raises(FileNotFoundError):
@@ -119,13 +170,72 @@ class TestImageCRUD:
         assert db.get_image(img_id) is None
 
     def test_get_all_images(self, db):
-        for i in range(3):
-            db.add_image(ImageRecord(
-                filepath=f"photos/{i}.jpg", filename=f"{i}.jpg"
-            ))
+        db.add_images_bulk([
+            ImageRecord(filepath=f"photos/{i}.jpg", filename=f"{i}.jpg")
+            for i in range(3)
+        ])
         images = db.get_all_images()
         assert len(images) == 3
 
+    def test_query_images(self, db):
+        db.add_images_bulk([
+            ImageRecord(filepath=f"photos/{i}.jpg", filename=f"{i}.jpg", year=y)
+            for i, y in enumerate((2019, 2020, 2019))
+        ])
+        images = db.query_images(
+            "SELECT i.* FROM images i WHERE i.year = ? ORDER BY i.filepath",
+            (2019,),
+        )
+        assert [img.filename for img in images] == ["0.jpg", "2.jpg"]
+
+    def test_add_images_bulk(self, db):
+        ids = db.add_images_bulk([
+            ImageRecord(filepath=f"photos/{i}.jpg", filename=f"{i}.jpg")
+            for i in range(1000)
+        ])
+        assert len(ids) == 1000
+        assert db.get_image_count() == 1000
+        assert db.get_image(ids[42]).filepath == "photos/42.jpg"
+
+    def test_add_images_bulk_rolls_back_on_error(self, db):
+        with pytest.raises(sqlite3.IntegrityError):
+            db.add_images_bulk([
+                ImageRecord(filepath="a.jpg", filename="a.jpg"),
+                ImageRecord(filepath="a.jpg", filename="a.jpg"),
+            ])
+        assert db.get_image_count() == 0
+
+    def test_iter_image_hashes(self, db):
+        db.add_images_bulk([
+            ImageRecord(filepath="c.jpg", filename="c.jpg", file_size=3,
+                        phash_0="0f", dhash_0="f0"),
+            ImageRecord(filepath="b.jpg", filename="b.jpg"),
+            ImageRecord(filepath="a.jpg", filename="a.jpg", file_size=1,
+                        phash_0="01", phash_90="02", dhash_0="03"),
+        ])
+        batches = list(db.iter_image_hashes(batch_size=1))
+        assert [len(batch) for batch in batches] == [1, 1]
+        assert [row[1:] for batch in batches for row in batch] == [
+            (1, "01", "02", "03", None),
+            (3, "0f", None, "f0", None),
+        ]
+
+    def test_get_image_hash_array(self, db):
+        assert len(db.get_image_hash_array()) == 0
+        db.add_images_bulk([
+            ImageRecord(filepath="b.jpg", filename="b.jpg", file_size=3,
+                        phash_0="0f", dhash_0="f0", dhash_90="zz"),
+            ImageRecord(filepath="a.jpg", filename="a.jpg",
+                        phash_0="01", phash_90="02", dhash_0="03"),
+        ])
+        images = db.get_image_hash_array()
+        assert images.ids.tolist() == [2, 1]
+        assert images.file_sizes.tolist() == [0, 3]
+        assert images.hashes.tolist() == [[1, 2, 3, 0], [15, 0, 240, 0]]
+        assert images.valid.tolist() == [
+            [True, True, True, False], [True, False, True, False],
+        ]
+
     def test_image_count(self, db):
         assert db.get_image_count() == 0
         db.add_image(ImageRecord(filepath="x.jpg", filename="x.jpg"))
@@ -150,6 +260,19 @@ class TestImageTags:
         assert len(tags) == 1
         assert tags[0].value == "Alice"
 
+    def test_set_image_tags_bulk(self, db):
+        id1, id2 = db.add_images_bulk([
+            ImageRecord(filepath=f"{n}.jpg", filename=f"{n}.jpg") for n in "ab"
+        ])
+        person_tag = db.resolve_tag_path("person")
+        db.set_image_tags_bulk([
+            (id1, person_tag.id, "Alice"),
+            (id1, person_tag.id, "Alice"),
+            (id2, person_tag.id, "Bob"),
+        ])
+        assert [t.value for t in db.get_image_tags(id1)] == ["Alice"]
+        assert [t.value for t in db.get_image_tags(id2)] == ["Bob"]
+
     def test_remove_tag(self, db):
         img_id = db.add_image(ImageRecord(
             filepath="tagged2.jpg", filename="tagged2.jpg"
@@ -175,19 +298,20 @@ class TestImageTags:
 
 class TestDuplicateGroups:
     def test_create_and_get_groups(self, db):
-        id1 = db.add_image(ImageRecord(filepath="d1.jpg", filename="d1.jpg"))
-        id2 = db.add_image(ImageRecord(filepath="d2.jpg", filename="d2.jpg"))
-
-        group_id = db.create_duplicate_group([id1, id2])
+        group_id, image_ids = db.create_duplicate_group_with_images([
+            ImageRecord(filepath="d1.jpg", filename="d1.jpg"),
+            ImageRecord(filepath="d2.jpg", filename="d2.jpg"),
+        ])
         groups = db.get_duplicate_groups()
         assert len(groups) == 1
-        assert len(groups[0].members) == 2
+        assert groups[0].id == group_id
+        assert [m.image_id for m in groups[0].members] == image_ids
 
     def test_update_duplicate_member(self, db):
-        id1 = db.add_image(ImageRecord(filepath="d3.jpg", filename="d3.jpg"))
-        id2 = db.add_image(ImageRecord(filepath="d4.jpg", filename="d4.jpg"))
-
-        db.create_duplicate_group([id1, id2])
+        db.create_duplicate_group_with_images([
+            ImageRecord(filepath="d3.jpg", filename="d3.jpg"),
+            ImageRecord(filepath="d4.jpg", filename="d4.jpg"),
+        ])
         groups = db.get_duplicate_groups()
         member = groups[0].members[0]
 
@@ -196,14 +320,34 @@ class TestDuplicateGroups:
         assert groups[0].members[0].is_kept is True
 
     def test_delete_group(self, db):
-        id1 = db.add_image(ImageRecord(filepath="d5.jpg", filename="d5.jpg"))
-        id2 = db.add_image(ImageRecord(filepath="d6.jpg", filename="d6.jpg"))
-        group_id = db.create_duplicate_group([id1, id2])
+        group_id, _ = db.create_duplicate_group_with_images([
+            ImageRecord(filepath="d5.jpg", filename="d5.jpg"),
+            ImageRecord(filepath="d6.jpg", filename="d6.jpg"),
+        ])
 
         db.delete_duplicate_group(group_id)
         groups = db.get_duplicate_groups()
         assert len(groups) == 0
 
+    def test_create_duplicate_groups(self, db):
+        ids = db.add_images_bulk([
+            ImageRecord(filepath=f"g{i}.jpg", filename=f"g{i}.jpg")
+            for i in range(5)
+        ])
+        group_ids = db.create_duplicate_groups([ids[:2], ids[2:]])
+        groups = db.get_duplicate_groups()
+        assert [g.id for g in groups] == group_ids
+        assert [len(g.members) for g in groups] == [2, 3]
+
+    def test_create_group_from_existing_images(self, db):
+        ids = db.add_images_bulk([
+            ImageRecord(filepath="d7.jpg", filename="d7.jpg"),
+            ImageRecord(filepath="d8.jpg", filename="d8.jpg"),
+        ])
+        db.create_duplicate_group(ids)
+        groups = db.get_duplicate_groups()
+        assert [m.image_id for m in groups[0].members] == ids
+
 
 class TestTagTree:
     def test_get_tag_tree(self, db):
@@ -230,3 +374,26 @@ class TestTagTree:
 
         carol = db.get_tag_definition_by_name("Carol", person.id)
         assert carol is not None
+
+    def test_returned_tags_do_not_alias_cache(self, db):
+        person = db.resolve_tag_path("person")
+        person.name = "renamed"
+        assert db.get_tag_definition(person.id).name == "person"
+
+    def test_invalidate_caches_after_direct_sql(self, db):
+        alice = db.resolve_tag_path("person.Alice")
+        assert db.get_tag_children(alice.id) == []
+        db.execute_query(
+            "INSERT INTO tag_definitions (name, parent_id) VALUES (?, ?)",
+            ("nickname", alice.id),
+        )
+        db.invalidate_caches()
+        assert [t.name for t in db.get_tag_children(alice.id)] == ["nickname"]
+
+    def test_resolve_tag_path_sees_new_tag(self, db):
+        person = db.resolve_tag_path("person")
+        assert db.resolve_tag_path("person.Carol") is None
+        tag_id = db.add_tag_definition(
+            TagDefinition(name="Carol", parent_id=person.id)
+        )
+        assert db.resolve_tag_path("person.Carol").id == tag_id
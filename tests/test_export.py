@@ -1,13 +1,19 @@
 """Tests for the export engine."""
 
+import errno
+import os
 import shutil
 from pathlib import Path
 
 import pytest
 
-from photo_manager.db.manager import DatabaseManager
+from photo_manager.db.manager import MEMORY_DATABASE, DatabaseManager
 from photo_manager.db.models import ImageRecord
-from photo_manager.export.exporter import ExportEngine, parse_export_template
+from photo_manager.export.exporter import (
+    ExportEngine,
+    _fast_copy,
+    parse_export_template,
+)
 
 
 TEST_PHOTOS = Path(__file__).parent.parent / "test_photos"
@@ -40,6 +46,40 @@ class TestExportTemplateParsing:
         assert segments[1].expand is False
 
 
+class TestFastCopy:
+    @pytest.fixture
+    def source_file(self, tmp_path):
+        src = tmp_path / "src.bin"
+        src.write_bytes(os.urandom(256 * 1024))
+        os.utime(src, (1_500_000_000, 1_500_000_000))
+        return src
+
+    def test_copies_data_and_mtime(self, source_file, tmp_path):
+        dst = tmp_path / "dst.bin"
+        _fast_copy(source_file, dst)
+        assert dst.read_bytes() == source_file.read_bytes()
+        assert dst.stat().st_mtime == source_file.stat().st_mtime
+
+    def test_falls_back_when_unsupported(self, source_file, tmp_path, monkeypatch):
+        def unsupported(*args, **kwargs):
+            raise OSError(errno.ENOSYS, "not supported")
+
+        monkeypatch.setattr(os, "copy_file_range", unsupported, raising=False)
+        dst = tmp_path / "dst.bin"
+        _fast_copy(source_file, dst)
+        assert dst.read_bytes() == source_file.read_bytes()
+
+    def test_fallback_preallocates_large_files(self, tmp_path, monkeypatch):
+        def unsupported(*args, **kwargs):
+            raise OSError(errno.EXDEV, "cross-device")
+
+        monkeypatch.setattr(os, "copy_file_range", unsupported, raising=False)
+        src, dst = tmp_path / "big.bin", tmp_path / "big_copy.bin"
+        src.write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+        _fast_copy(src, dst)
+        assert dst.read_bytes() == src.read_bytes()
+
+
 class TestExportEngine:
     @pytest.fixture
     def export_setup(self, tmp_path):
@@ -63,18 +103,20 @@ class TestExportEngine:
         db.create_database(db_path)
 
         # Add images to database
-        id1 = db.add_image(ImageRecord(
-            filepath="source/photo1.jpg", filename="photo1.jpg",
-            year=2019, file_size=1000,
-        ))
-        id2 = db.add_image(ImageRecord(
-            filepath="source/photo2.jpg", filename="photo2.jpg",
-            year=2020, file_size=2000,
-        ))
-        id3 = db.add_image(ImageRecord(
-            filepath="source/photo3.jpg", filename="photo3.jpg",
-            year=2019, file_size=1500,
-        ))
+        id1, id2, id3 = db.add_images_bulk([
+            ImageRecord(
+                filepath="source/photo1.jpg", filename="photo1.jpg",
+                year=2019, file_size=1000,
+            ),
+            ImageRecord(
+                filepath="source/photo2.jpg", filename="photo2.jpg",
+                year=2020, file_size=2000,
+            ),
+            ImageRecord(
+                filepath="source/photo3.jpg", filename="photo3.jpg",
+                year=2019, file_size=1500,
+            ),
+        ])
 
         # Tag images
         event_tag = db.resolve_tag_path("event")
@@ -151,3 +193,96 @@ class TestExportEngine:
 
         assert result.exported == 3
         assert (export_dir / "Unknown").exists()
+
+    def test_export_same_name_gets_unique_paths(self, tmp_path):
+        for sub in ("a", "b"):
+            (tmp_path / sub).mkdir()
+            (tmp_path / sub / "photo.jpg").write_bytes(sub.encode())
+        db = DatabaseManager()
+        db.create_database(tmp_path / ".photo_manager.db")
+        db.add_images_bulk([
+            ImageRecord(filepath=f"{sub}/photo.jpg", filename="photo.jpg", year=2020)
+            for sub in ("a", "b")
+        ])
+        export_dir = tmp_path / "export_same"
+
+        result = ExportEngine(db).export(
+            db.get_all_images(), export_dir,
+            template="{tag.datetime.year}",
+            max_workers=2,
+        )
+        db.close()
+
+        assert result.total == result.exported == 2
+        assert (export_dir / "2020" / "photo.jpg").read_bytes() == b"a"
+        assert (export_dir / "2020" / "photo_1.jpg").read_bytes() == b"b"
+
+    def test_move_in_place_keeps_destination_dirs(self, tmp_path):
+        # x.jpg leaves 2019/ empty, but y.jpg is still bound for it
+        for rel in ("2019/x.jpg", "old/y.jpg"):
+            (tmp_path / rel).parent.mkdir(exist_ok=True)
+            (tmp_path / rel).write_bytes(rel.encode())
+        db = DatabaseManager()
+        db.create_database(tmp_path / ".photo_manager.db")
+        db.add_images_bulk([
+            ImageRecord(filepath="2019/x.jpg", filename="x.jpg", year=2020),
+            ImageRecord(filepath="old/y.jpg", filename="y.jpg", year=2019),
+        ])
+
+        result = ExportEngine(db).export(
+            db.get_all_images(), tmp_path,
+            template="{tag.datetime.year}",
+            mode="move",
+            export_csv=False,
+        )
+        moved = sorted(image.filepath for image in db.get_all_images())
+        db.close()
+
+        assert result.exported == 2
+        assert moved == ["2019/y.jpg", "2020/x.jpg"]
+        assert (tmp_path / "2019" / "y.jpg").read_bytes() == b"old/y.jpg"
+        assert not (tmp_path / "old").exists()
+
+    def test_write_csv_fills_missing_columns(self, tmp_path):
+        csv_path = tmp_path / "image_metadata.csv"
+        ExportEngine(DatabaseManager())._write_csv(csv_path, [
+            {"filepath": "a.jpg", "tag_event": "birthday"},
+            {"filepath": "b.jpg", "tag_person": "Alice", "year": None},
+        ])
+        lines = csv_path.read_text(encoding="utf-8").splitlines()
+        assert lines == [
+            "filepath,tag_event,tag_person,year",
+            "a.jpg,birthday,,",
+            "b.jpg,,Alice,",
+        ]
+
+    def test_write_csv_in_blocks(self, tmp_path):
+        csv_path = tmp_path / "image_metadata.csv"
+        rows = [{"filepath": f"{i}.jpg", "year": 2000 + i} for i in range(5)]
+        ExportEngine(DatabaseManager())._write_csv(csv_path, rows, flush_every=2)
+        lines = csv_path.read_text(encoding="utf-8").splitlines()
+        assert lines == ["filepath,year"] + [
+            f"{i}.jpg,{2000 + i}" for i in range(5)
+        ]
+
+    def test_compiled_template_falls_back_to_image_tags(self):
+        db = DatabaseManager()
+        db.create_database(MEMORY_DATABASE)
+        tagged_id, _ = db.add_images_bulk([
+            ImageRecord(filepath="a.jpg", filename="a.jpg"),
+            ImageRecord(filepath="b.jpg", filename="b.jpg"),
+        ])
+        year_tag = db.resolve_tag_path("datetime.year")
+        db.set_image_tag(tagged_id, year_tag.id, "1999")
+
+        engine = ExportEngine(db)
+        components = engine._compile_template(
+            parse_export_template("{tag.datetime.year}/photos")
+        )
+        paths = {
+            image.filename: "/".join(c(image) for c in components)
+            for image in db.get_all_images()
+        }
+        db.close()
+
+        assert paths == {"a.jpg": "1999/photos", "b.jpg": "Unknown/photos"}
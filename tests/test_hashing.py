@@ -1,17 +1,71 @@
 """Tests for perceptual hashing and duplicate detection."""
 
+import random
 from pathlib import Path
 
+import imagehash
+import numpy as np
 import pytest
+from PIL import Image, ImageDraw
 
-from photo_manager.db.manager import DatabaseManager
-from photo_manager.db.models import ImageRecord
+from photo_manager.db.manager import MEMORY_DATABASE, DatabaseManager
+from photo_manager.db.models import ImageRecord, hash_to_hex, hash_to_int
+from photo_manager.hashing._kernels import (
+    _iter_equal_key_pairs,
+    _popcount64_swar,
+    iter_indexed_pairs,
+    iter_tiled_pairs,
+)
+from photo_manager.hashing.cache import HashCache
 from photo_manager.hashing.duplicates import DuplicateDetector
-from photo_manager.hashing.hasher import BackgroundHasher, compute_hashes
+from photo_manager.hashing.hasher import (
+    BackgroundHasher,
+    ImageHashes,
+    compute_hashes,
+    compute_hashes_batch,
+)
 
 TEST_PHOTOS = Path(__file__).parent.parent / "test_photos"
 
 
+def _reference_duplicate_pairs(
+    images: list[ImageRecord], threshold: int
+) -> set[frozenset[int]]:
+    """Brute-force pairwise duplicate check, one pair at a time."""
+
+    def values(*hexes):
+        return [v for v in map(hash_to_int, hexes) if v is not None]
+
+    def close(xs, ys):
+        return any((x ^ y).bit_count() <= threshold for x in xs for y in ys)
+
+    pairs = set()
+    for i, a in enumerate(images):
+        for b in images[i + 1:]:
+            if (
+                close(values(a.phash_0, a.phash_90), values(b.phash_0, b.phash_90))
+                and close(values(a.dhash_0, a.dhash_90), values(b.dhash_0, b.dhash_90))
+            ):
+                pairs.add(frozenset((a.id, b.id)))
+    return pairs
+
+
+@pytest.fixture(scope="session")
+def synthetic_images(tmp_path_factory):
+    """Write a few distinct synthetic JPEGs once and return their paths."""
+    tmp_path = tmp_path_factory.mktemp("synthetic")
+    paths = []
+    for i in range(4):
+        img = Image.new("RGB", (120, 90), (20 * i, 40, 200 - 30 * i))
+        draw = ImageDraw.Draw(img)
+        draw.rectangle((10 + 15 * i, 10, 60 + 10 * i, 70), fill=(255, 255, 0))
+        draw.ellipse((70 - 10 * i, 20, 110, 80), fill=(0, 120, 255))
+        path = tmp_path / f"synthetic_{i}.jpg"
+        img.save(path)
+        paths.append(path)
+    return paths
+
+
 class TestImageHasher:
     def test_compute_hashes_jpg(self):
         jpg_files = list(TEST_PHOTOS.rglob("*.jpg"))
@@ -62,6 +116,138 @@ class TestImageHasher:
         assert h1.phash_0 != h2.phash_0 or h1.dhash_0 != h2.dhash_0
 
 
+class TestHashKernels:
+    def test_swar_popcount(self):
+        rng = np.random.default_rng(3)
+        values = rng.integers(0, 2**64, size=1000, dtype=np.uint64)
+        values[:2] = [0, 2**64 - 1]
+        expected = [bin(int(v)).count("1") for v in values]
+        assert _popcount64_swar(values).tolist() == expected
+
+    def test_matches_imagehash(self, synthetic_images):
+        for path in synthetic_images:
+            hashes = compute_hashes(path)
+            with Image.open(path) as img:
+                img_90 = img.transpose(Image.Transpose.ROTATE_90)
+                assert hashes.phash_0 == str(imagehash.phash(img))
+                assert hashes.dhash_0 == str(imagehash.dhash(img))
+                assert hashes.phash_90 == str(imagehash.phash(img_90))
+                assert hashes.dhash_90 == str(imagehash.dhash(img_90))
+
+    def test_large_jpeg_draft_decode(self, tmp_path):
+        # Big enough that the JPEG is decoded at a reduced DCT scale
+        img = Image.new("RGB", (1600, 1200), (40, 90, 160))
+        draw = ImageDraw.Draw(img)
+        draw.rectangle((200, 150, 900, 1000), fill=(250, 220, 30))
+        draw.ellipse((700, 300, 1500, 1100), fill=(10, 140, 60))
+        path = tmp_path / "large.jpg"
+        img.save(path, quality=90)
+
+        hashes = compute_hashes(path)
+        drafted = compute_hashes(path, draft=True)
+        with Image.open(path) as full:
+            # The default full decode stays comparable with stored hashes
+            assert hashes.phash_0 == str(imagehash.phash(full))
+            assert hashes.dhash_0 == str(imagehash.dhash(full))
+            for ours, reference in (
+                (drafted.phash_0, imagehash.phash(full)),
+                (drafted.dhash_0, imagehash.dhash(full)),
+            ):
+                distance = hash_to_int(ours) ^ hash_to_int(str(reference))
+                assert distance.bit_count() <= 2
+
+    def test_hash_open_image(self, synthetic_images):
+        with Image.open(synthetic_images[0]) as img:
+            hashes = compute_hashes(img)
+            img.load()  # still usable by the caller
+        assert hashes == compute_hashes(synthetic_images[0])
+
+    @pytest.fixture
+    def clustered_hashes(self):
+        """50 rows of 2 rotations scattered a few bits around 6 bases."""
+        rng = np.random.default_rng(7)
+        base = rng.integers(0, 2**63, size=(6, 1), dtype=np.uint64)
+        noise = np.zeros((50, 2), dtype=np.uint64)
+        for _ in range(3):
+            noise ^= np.uint64(1) << rng.integers(0, 64, size=(50, 2), dtype=np.uint64)
+        hashes = base[np.arange(50) % 6] ^ noise
+        valid = rng.random((50, 2)) > 0.1
+        return hashes, valid
+
+    @staticmethod
+    def _pairs(batches):
+        found = set()
+        for rows, cols, _, _ in batches:
+            assert (rows < cols).all()
+            found.update(zip(rows.tolist(), cols.tolist()))
+        return found
+
+    def test_tiled_pairs_match_single_tile(self, clustered_hashes):
+        hashes, valid = clustered_hashes
+
+        def tiled(block_size):
+            return iter_tiled_pairs(
+                hashes, valid, hashes, valid, threshold=4, block_size=block_size
+            )
+
+        whole = self._pairs(tiled(64))
+        assert whole
+        assert self._pairs(tiled(7)) == whole
+        *_, (_, _, done, total) = tiled(7)
+        assert done == total == 50 * 49 // 2
+
+    @pytest.mark.parametrize("threshold", [0, 2, 5, 7])
+    def test_indexed_pairs_match_tiled(self, clustered_hashes, threshold):
+        hashes, valid = clustered_hashes
+        args = (hashes, valid, hashes, valid, threshold)
+        assert self._pairs(iter_indexed_pairs(*args)) == self._pairs(
+            iter_tiled_pairs(*args)
+        )
+
+    def test_equal_key_pairs_batching(self):
+        keys = np.array([3, 1, 3, 2, 1, 3, 3], dtype=np.uint64)
+        rows = np.array([0, 1, 2, 3, 4, 5, 0])
+
+        def collect(batch_size):
+            return sorted(
+                pair
+                for a, b in _iter_equal_key_pairs(keys, rows, batch_size)
+                for pair in zip(a.tolist(), b.tolist())
+            )
+
+        expected = [(0, 2), (0, 2), (0, 5), (0, 5), (1, 4), (2, 5)]
+        assert collect(batch_size=1) == expected
+        assert collect(batch_size=1000) == expected
+
+
+class TestHashConversion:
+    def test_round_trip(self):
+        value = hash_to_int("abcdef1234567890")
+        assert isinstance(value, int)
+        assert hash_to_hex(value) == "abcdef1234567890"
+        assert hash_to_hex(hash_to_int("000000000000000f")) == "000000000000000f"
+
+    def test_missing_or_invalid(self):
+        assert hash_to_int(None) is None
+        assert hash_to_int("") is None
+        assert hash_to_int("not-hex") is None
+
+
+class TestBatchHashing:
+    def test_batch_matches_single(self, synthetic_images):
+        results = compute_hashes_batch(synthetic_images, max_workers=2)
+        assert len(results) == len(synthetic_images)
+        for path, hashes in zip(synthetic_images, results):
+            assert hashes is not None
+            assert hashes == compute_hashes(path)
+
+    def test_batch_single_and_empty(self, synthetic_images):
+        assert compute_hashes_batch([]) == []
+        assert compute_hashes_batch(synthetic_images[:1]) == [
+            compute_hashes(synthetic_images[0])
+        ]
+
+
 class TestBackgroundHasher:
     def test_background_hashing(self):
         jpg_files = list(TEST_PHOTOS.rglob("*.jpg"))
@@ -78,12 +264,68 @@ class TestBackgroundHasher:
             assert hashes is not None
         hasher.shutdown()
 
+    def test_batched_results(self, synthetic_images):
+        hasher = BackgroundHasher(max_workers=2, batch_size=3)
+        for i, f in enumerate(synthetic_images):
+            hasher.submit(i + 1, f)
+        ordered = hasher.get_results()
+
+        for i, f in enumerate(synthetic_images):
+            hasher.submit(i + 1, f)
+        streamed = dict(hasher.iter_results())
+        hasher.shutdown()
+
+        assert [image_id for image_id, _ in ordered] == [1, 2, 3, 4]
+        assert streamed == dict(ordered)
+        assert ordered[0][1] == compute_hashes(synthetic_images[0])
+
+
+class TestHashCache:
+    @pytest.fixture
+    def cache(self):
+        db = DatabaseManager()
+        db.create_database(MEMORY_DATABASE)
+        yield HashCache(db)
+        db.close()
+
+    def test_compute_reuses_unchanged_file(self, cache, synthetic_images, monkeypatch):
+        path = synthetic_images[0]
+        first = cache.compute(path)
+        monkeypatch.setattr(
+            "photo_manager.hashing.cache.compute_hashes",
+            lambda _: pytest.fail("cached file was re-hashed"),
+        )
+        assert cache.compute(path) == first == compute_hashes(path)
+
+    def test_changed_file_is_rehashed(self, cache, synthetic_images, tmp_path):
+        path = tmp_path / "photo.jpg"
+        path.write_bytes(synthetic_images[0].read_bytes())
+        assert cache.compute(path) == compute_hashes(synthetic_images[0])
+        path.write_bytes(synthetic_images[1].read_bytes())
+        assert cache.compute(path) == compute_hashes(synthetic_images[1])
+
+    def test_background_hasher_skips_cached(self, cache, synthetic_images):
+        # Workers run in other processes, so plant an entry that re-hashing
+        # could never produce rather than patching compute_hashes
+        planted = ImageHashes("0" * 16, "1" * 16, "2" * 16, "3" * 16)
+        cache.put_many([(cache.file_key(synthetic_images[0]), planted)])
+        hasher = BackgroundHasher(max_workers=1, batch_size=8, cache=cache)
+        for i, f in enumerate(synthetic_images):
+            hasher.submit(i + 1, f)
+        results = hasher.get_results()
+        hasher.shutdown()
+
+        expected = [planted] + [compute_hashes(f) for f in synthetic_images[1:]]
+        assert results == [(i + 1, h) for i, h in enumerate(expected)]
+        for f, hashes in zip(synthetic_images, expected):
+            assert cache.get(cache.file_key(f)) == hashes
+
 
 class TestDuplicateDetector:
     @pytest.fixture
-    def db_with_hashes(self, tmp_path):
+    def db_with_hashes(self):
         db = DatabaseManager()
-        db.create_database(tmp_path / "dup_test.db")
+        db.create_database(MEMORY_DATABASE)
 
         # Add images with known hashes
         img1 = ImageRecord(
@@ -105,9 +347,7 @@ class TestDuplicateDetector:
             file_size=500,
         )
 
-        db.add_image(img1)
-        db.add_image(img2)
-        db.add_image(img3)
+        db.add_images_bulk([img1, img2, img3])
 
         yield db
         db.close()
@@ -132,3 +372,39 @@ class TestDuplicateDetector:
         stored_groups = db_with_hashes.get_duplicate_groups()
         assert len(stored_groups) == 1
         assert len(stored_groups[0].members) == 2
+
+    def test_matches_pairwise_reference(self):
+        rng = random.Random(1234)
+        bases = [rng.getrandbits(64) for _ in range(5)]
+
+        def near(base):
+            for _ in range(rng.randint(0, 8)):
+                base ^= 1 << rng.randrange(64)
+            return hash_to_hex(base)
+
+        db = DatabaseManager()
+        db.create_database(MEMORY_DATABASE)
+        db.add_images_bulk([
+            ImageRecord(
+                filepath=f"{i}.jpg", filename=f"{i}.jpg",
+                phash_0=near(bases[i % 5]),
+                phash_90=near(bases[(i + 1) % 5]) if i % 3 else None,
+                dhash_0=near(bases[i % 5]),
+                dhash_90="not-hex" if i % 7 == 0 else near(bases[(i + 2) % 5]),
+            )
+            for i in range(60)
+        ])
+        images = db.get_all_images()
+        groups = DuplicateDetector(db, threshold=5).find_duplicates()
+        expected = _reference_duplicate_pairs(images, threshold=5)
+        db.close()
+
+        # Groups must be exactly the connected components of the pairs
+        components: dict[int, set[int]] = {}
+        for a, b in map(tuple, expected):
+            merged = components.get(a, {a}) | components.get(b, {b})
+            for img_id in merged:
+                components[img_id] = merged
+        expected_groups = {frozenset(c) for c in components.values()}
+        assert expected_groups
+        assert {frozenset(g) for g in groups} == expected_groups
@@ -2,15 +2,17 @@
 
 import pytest
 
-from photo_manager.db.manager import DatabaseManager
-from photo_manager.db.models import ImageRecord
-from photo_manager.query.engine import QueryEngine
+from photo_manager.db.manager import MEMORY_DATABASE, DatabaseManager
+from photo_manager.db.models import ImageRecord, TagDefinition
+from photo_manager.query.engine import NUMERIC_PATHS, QueryEngine
 from photo_manager.query.parser import (
     ComparisonNode,
     LogicalNode,
     QueryParseError,
+    ast_key,
     parse_query,
 )
+from photo_manager.query.simplify import simplify
 
 
 class TestQueryParser:
@@ -80,37 +82,87 @@ class TestQueryParser:
         assert isinstance(ast, ComparisonNode)
         assert ast.value == "Alice"
 
+    def test_repeated_parse_is_cached(self):
+        ast = parse_query('tag.person=="Alice" && tag.datetime.year>=2018')
+        assert parse_query('tag.person=="Alice" && tag.datetime.year>=2018') is ast
+        with pytest.raises(AttributeError):
+            ast.operator = "||"
+
+
+class TestSimplify:
+    @pytest.mark.parametrize("query, expected", [
+        ('tag.favorite==true && tag.favorite==true', "tag.favorite==true"),
+        (
+            "tag.datetime.year>=2019 && tag.datetime.year>=2018",
+            "tag.datetime.year>=2019",
+        ),
+        (
+            "tag.datetime.year>2018 && tag.datetime.year>=2019",
+            "tag.datetime.year>2018",
+        ),
+        (
+            "tag.datetime.year==2020 && tag.datetime.year<=2021",
+            "tag.datetime.year==2020",
+        ),
+        (
+            "tag.datetime.year==2020 || tag.datetime.year>=2019",
+            "tag.datetime.year>=2019",
+        ),
+        (
+            'tag.person=="Alice" && (tag.event=="x" && tag.person=="Alice")',
+            'tag.person=="Alice" && tag.event=="x"',
+        ),
+    ])
+    def test_redundant_terms_removed(self, query, expected):
+        simplified = simplify(parse_query(query), NUMERIC_PATHS)
+        assert ast_key(simplified) == ast_key(parse_query(expected))
+
+    @pytest.mark.parametrize("query", [
+        # Text-valued tags compare as strings, so no numeric subsumption
+        "tag.person>=2 && tag.person>=10",
+        "tag.datetime.year==2019 && tag.datetime.year==2020",
+        "tag.datetime.year>=2019.5 && tag.datetime.year>=2018",
+        'tag.person==1 || tag.person==1.0 || tag.person==true',
+    ])
+    def test_independent_terms_kept(self, query):
+        ast = parse_query(query)
+        assert ast_key(simplify(ast, NUMERIC_PATHS)) == ast_key(ast)
+
 
 class TestQueryEngine:
     @pytest.fixture
-    def db_with_data(self, tmp_path):
+    def db_with_data(self):
         db = DatabaseManager()
-        db.create_database(tmp_path / "query_test.db")
+        db.create_database(MEMORY_DATABASE)
 
         # Add test images
-        id1 = db.add_image(ImageRecord(
-            filepath="alice_bday.jpg", filename="alice_bday.jpg",
-            year=2019, favorite=True,
-        ))
-        id2 = db.add_image(ImageRecord(
-            filepath="bob_vacation.jpg", filename="bob_vacation.jpg",
-            year=2020, favorite=False,
-        ))
-        id3 = db.add_image(ImageRecord(
-            filepath="alice_vacation.jpg", filename="alice_vacation.jpg",
-            year=2019, favorite=True,
-        ))
+        id1, id2, id3 = db.add_images_bulk([
+            ImageRecord(
+                filepath="alice_bday.jpg", filename="alice_bday.jpg",
+                year=2019, favorite=True,
+            ),
+            ImageRecord(
+                filepath="bob_vacation.jpg", filename="bob_vacation.jpg",
+                year=2020, favorite=False,
+            ),
+            ImageRecord(
+                filepath="alice_vacation.jpg", filename="alice_vacation.jpg",
+                year=2019, favorite=True,
+            ),
+        ])
 
         # Tag images
         person_tag = db.resolve_tag_path("person")
         event_tag = db.resolve_tag_path("event")
 
-        db.set_image_tag(id1, person_tag.id, "Alice")
-        db.set_image_tag(id1, event_tag.id, "birthday")
-        db.set_image_tag(id2, person_tag.id, "Bob")
-        db.set_image_tag(id2, event_tag.id, "vacation")
-        db.set_image_tag(id3, person_tag.id, "Alice")
-        db.set_image_tag(id3, event_tag.id, "vacation")
+        db.set_image_tags_bulk([
+            (id1, person_tag.id, "Alice"),
+            (id1, event_tag.id, "birthday"),
+            (id2, person_tag.id, "Bob"),
+            (id2, event_tag.id, "vacation"),
+            (id3, person_tag.id, "Alice"),
+            (id3, event_tag.id, "vacation"),
+        ])
 
         yield db
         db.close()
@@ -151,6 +203,54 @@ class TestQueryEngine:
         )
         assert len(results) == 3
 
+    def test_query_many(self, db_with_data):
+        engine = QueryEngine(db_with_data)
+        queries = [
+            'tag.person=="Alice"',
+            "tag.datetime.year==2020",
+            "tag.datetime.year==1999",
+            'tag.person=="Alice"',
+        ]
+        results = engine.query_many(queries)
+        assert [
+            sorted(img.filepath for img in images) for images in results
+        ] == [
+            sorted(img.filepath for img in engine.query(q)) for q in queries
+        ]
+        assert engine.query_many([]) == []
+
+    def test_query_many_splits_statements(self, db_with_data, monkeypatch):
+        from photo_manager.query import engine as engine_module
+
+        engine = QueryEngine(db_with_data)
+        alice = sorted(img.filepath for img in engine.query('tag.person=="Alice"'))
+        results = engine.query_many(['tag.person=="Alice"'] * 600)
+        assert [sorted(img.filepath for img in r) for r in results] == [alice] * 600
+
+        monkeypatch.setattr(engine_module, "MAX_SQL_PARAMS", 1)
+        queries = ['tag.person=="Alice"', "tag.datetime.year==2020"]
+        assert [
+            sorted(img.filepath for img in images)
+            for images in engine.query_many(queries)
+        ] == [
+            sorted(img.filepath for img in engine.query(q)) for q in queries
+        ]
+
+    def test_or_of_equalities_fuses_into_in(self, db_with_data):
+        engine = QueryEngine(db_with_data)
+        sql, params = engine.to_sql(parse_query(
+            'tag.person=="Alice" || tag.datetime.year==2020 '
+            '|| tag.person=="Bob"'
+        ))
+        assert sql.count("FROM image_tags") == 1
+        assert "it1.value IN (?, ?)" in sql
+        person = db_with_data.resolve_tag_path("person").id
+        assert params == [person, "Alice", "Bob", 2020]
+        assert len(engine.query(
+            'tag.person=="Alice" || tag.datetime.year==2020 '
+            '|| tag.person=="Bob"'
+        )) == 3
+
     def test_query_not_equal(self, db_with_data):
         engine = QueryEngine(db_with_data)
         results = engine.query("tag.datetime.year!=2020")
@@ -160,6 +260,49 @@ class TestQueryEngine:
         engine = QueryEngine(db_with_data)
         ast = parse_query("tag.datetime.year>=2018")
         sql, params = engine.to_sql(ast)
-        assert "SELECT DISTINCT i.* FROM images i" in sql
-        assert "i.year >= ?" in sql
+        assert sql == "SELECT i.* FROM images i WHERE i.year >= ?"
         assert params == [2018]
+
+    def test_to_sql_puts_column_filters_first(self, db_with_data):
+        engine = QueryEngine(db_with_data)
+        sql, params = engine.to_sql(parse_query(
+            'tag.person=="Alice" && tag.datetime.year==2019'
+        ))
+        assert "DISTINCT" not in sql
+        assert sql.index("i.year = ?") < sql.index("EXISTS")
+        person = db_with_data.resolve_tag_path("person").id
+        assert params == [2019, person, "Alice"]
+
+    def test_to_sql_orders_and_terms_by_cost(self, db_with_data):
+        engine = QueryEngine(db_with_data)
+        sql, _ = engine.to_sql(parse_query(
+            '(tag.event=="vacation" || tag.favorite==true) '
+            '&& tag.person!="Bob" && tag.datetime.year>=2019 '
+            '&& tag.person=="Alice" && tag.image_size.width==4 '
+            '&& tag.datetime.year==2019'
+        ))
+        fragments = [
+            "i.year = ?", "i.width = ?", "i.year >= ?",
+            ".value = ?", ".value != ?", " OR ",
+        ]
+        positions = [sql.index(f) for f in fragments]
+        assert positions == sorted(positions)
+
+    def test_to_sql_cache_keeps_value_types_apart(self, db_with_data):
+        engine = QueryEngine(db_with_data)
+        person = db_with_data.resolve_tag_path("person").id
+        first = engine.to_sql(parse_query("tag.person==1"))
+        first[1].append("caller mutation")
+        assert engine.to_sql(parse_query("tag.person==1")) == (
+            first[0], [person, "1"],
+        )
+        assert engine.to_sql(parse_query("tag.person==1.0"))[1] == [person, "1.0"]
+
+    def test_to_sql_sees_new_tags(self, db_with_data):
+        engine = QueryEngine(db_with_data)
+        assert engine.query('tag.mood=="happy"') == []
+        mood = db_with_data.add_tag_definition(TagDefinition(name="mood"))
+        image = db_with_data.get_image_by_path("alice_bday.jpg")
+        db_with_data.set_image_tag(image.id, mood, "happy")
+        results = engine.query('tag.mood=="happy"')
+        assert [img.filepath for img in results] == ["alice_bday.jpg"]
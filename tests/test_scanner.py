@@ -1,12 +1,11 @@
 """Tests for EXIF extraction, datetime parsing, tag templates, and directory scanner."""
 
-import shutil
 from datetime import datetime
 from pathlib import Path
 
 import pytest
 
-from photo_manager.db.manager import DatabaseManager
+from photo_manager.db.manager import MEMORY_DATABASE, DatabaseManager
 from photo_manager.scanner.datetime_parser import (
     parse_datetime,
     _parse_from_filename,
@@ -15,6 +14,7 @@ from photo_manager.scanner.datetime_parser import (
 from photo_manager.scanner.exif import ExifData, extract_exif
 from photo_manager.scanner.scanner import DirectoryScanner
 from photo_manager.scanner.tag_template import (
+    TemplateMatcher,
     parse_template,
     match_filepath,
     validate_template,
@@ -24,6 +24,11 @@ from photo_manager.scanner.tag_template import (
 # Use the project's test_photos directory
 TEST_PHOTOS = Path(__file__).parent.parent / "test_photos"
 
+# Checked once at import rather than stat'ed again in every test
+requires_photos = pytest.mark.skipif(
+    not TEST_PHOTOS.exists(), reason="test_photos directory not found"
+)
+
 
 class TestExifExtraction:
     def test_extract_from_jpg(self):
@@ -149,9 +154,21 @@ class TestTagTemplate:
         assert result["datetime.year"] == "2019"
         assert result["event.vacation"] == "Lake"
 
-    def test_validate_template(self, tmp_path):
+    def test_template_matcher_picks_first_template_per_depth(self):
+        matcher = TemplateMatcher([
+            parse_template("./{datetime.year}/*"),
+            parse_template("./{datetime.year}/{event.vacation}/*"),
+            parse_template("./{person}/*"),
+        ])
+        assert matcher.match("2019/photo.jpg") == {"datetime.year": "2019"}
+        assert matcher.match("2019/Lake/photo.jpg") == {
+            "datetime.year": "2019", "event.vacation": "Lake",
+        }
+        assert matcher.match("a/b/c/photo.jpg") == {}
+
+    def test_validate_template(self):
         db = DatabaseManager()
-        db.create_database(tmp_path / "test.db")
+        db.create_database(MEMORY_DATABASE)
         t = parse_template("./{datetime.year}/{nonexistent.tag}/*")
         warnings = validate_template(t, db)
         assert len(warnings) > 0
@@ -168,10 +185,8 @@ class TestDirectoryScanner:
         yield db
         db.close()
 
+    @requires_photos
     def test_scan_test_photos(self, scanner_db):
-        if not TEST_PHOTOS.exists():
-            pytest.skip("test_photos directory not found")
-
         scanner = DirectoryScanner(scanner_db)
         result = scanner.scan_directory(TEST_PHOTOS)
 
@@ -183,10 +198,8 @@ class TestDirectoryScanner:
         count = scanner_db.get_image_count()
         assert count == result.added
 
+    @requires_photos
     def test_scan_skips_already_added(self, scanner_db):
-        if not TEST_PHOTOS.exists():
-            pytest.skip("test_photos directory not found")
-
         scanner = DirectoryScanner(scanner_db)
         result1 = scanner.scan_directory(TEST_PHOTOS)
         result2 = scanner.scan_directory(TEST_PHOTOS)
@@ -194,10 +207,65 @@ class TestDirectoryScanner:
         assert result2.added == 0
         assert result2.skipped == result1.added
 
-    def test_scan_extracts_dimensions(self, scanner_db):
-        if not TEST_PHOTOS.exists():
-            pytest.skip("test_photos directory not found")
+    def test_scan_in_batches(self, scanner_db, tmp_path, monkeypatch):
+        from PIL import Image
+
+        from photo_manager.scanner import scanner as scanner_module
+
+        monkeypatch.setattr(scanner_module, "SCAN_BATCH_SIZE", 2)
+        photos = tmp_path / "photos"
+        for year, name in [("2019", "a"), ("2019", "b"), ("2020", "c")]:
+            (photos / year).mkdir(parents=True, exist_ok=True)
+            Image.new("RGB", (4, 3)).save(photos / year / f"{name}.png")
+        (photos / "2020" / ".hidden.png").write_bytes(b"")
+        (photos / "2020" / "notes.txt").write_text("not an image")
+
+        progress = []
+        result = DirectoryScanner(scanner_db).scan_directory(
+            photos,
+            templates=[parse_template("./photos/{datetime.year}/*")],
+            progress_callback=lambda i, total, path: progress.append((i, total)),
+        )
 
+        assert (result.total_found, result.added, result.errors) == (3, 3, 0)
+        assert progress == [(1, 3), (2, 3), (3, 3)]
+        images = scanner_db.get_all_images()
+        assert [img.filename for img in images] == ["a.png", "b.png", "c.png"]
+        year_tag = scanner_db.resolve_tag_path("datetime.year")
+        [tag] = scanner_db.get_image_tags(images[2].id)
+        assert (tag.tag_id, tag.value) == (year_tag.id, "2020")
+
+    def test_scan_falls_back_to_single_inserts(
+        self, scanner_db, tmp_path, monkeypatch
+    ):
+        from PIL import Image
+
+        photos = tmp_path / "photos"
+        photos.mkdir()
+        for name in ["a", "b", "c"]:
+            Image.new("RGB", (4, 3)).save(photos / f"{name}.png")
+
+        add_image = scanner_db.add_image
+
+        def failing_add_bulk(images):
+            raise RuntimeError("bulk insert failed")
+
+        def failing_add_image(image):
+            if image.filename == "b.png":
+                raise RuntimeError("insert failed")
+            return add_image(image)
+
+        monkeypatch.setattr(scanner_db, "add_images_bulk", failing_add_bulk)
+        monkeypatch.setattr(scanner_db, "add_image", failing_add_image)
+        result = DirectoryScanner(scanner_db).scan_directory(photos)
+
+        assert (result.added, result.errors) == (2, 1)
+        assert result.error_files == [str(photos / "b.png")]
+        images = scanner_db.get_all_images()
+        assert [img.filename for img in images] == ["a.png", "c.png"]
+
+    @requires_photos
+    def test_scan_extracts_dimensions(self, scanner_db):
         scanner = DirectoryScanner(scanner_db)
         scanner.scan_directory(TEST_PHOTOS)
 
@@ -5,246 +5,207 @@ in headless mode. These test the non-GUI logic of viewer components.
 """
 
 import os
-import sys
 from pathlib import Path
-from unittest.mock import MagicMock
 
 import pytest
 
+# Everything under test here imports PyQt6; skip the module once if absent
+Qt = pytest.importorskip("PyQt6.QtCore").Qt
+
+# Headless runs can deselect these with -m "not gui"
+pytestmark = pytest.mark.gui
+
+from photo_manager.viewer.app import build_parser
 from photo_manager.viewer.image_loader import ImageCache, collect_image_files
 from photo_manager.viewer.key_handler import Action, KeyHandler
 
 
 TEST_PHOTOS = Path(__file__).parent.parent / "test_photos"
 
+# Checked once at import rather than stat'ed again in every test
+requires_photos = pytest.mark.skipif(
+    not TEST_PHOTOS.exists(), reason="test_photos directory not found"
+)
+
+
+@pytest.fixture(scope="module")
+def collected_images() -> dict[str, list[str]]:
+    """collect_image_files(TEST_PHOTOS) results, walked once per mode."""
+    return {
+        "recursive": collect_image_files(TEST_PHOTOS, recursive=True),
+        "flat": collect_image_files(TEST_PHOTOS, recursive=False),
+    }
 
+
+@requires_photos
 class TestCollectImageFiles:
-    def test_finds_images(self):
-        if not TEST_PHOTOS.exists():
-            pytest.skip("test_photos not found")
-        files = collect_image_files(TEST_PHOTOS)
-        assert len(files) > 0
-
-    def test_finds_all_formats(self):
-        if not TEST_PHOTOS.exists():
-            pytest.skip("test_photos not found")
-        files = collect_image_files(TEST_PHOTOS)
-        extensions = {Path(f).suffix.lower() for f in files}
+    def test_finds_images(self, collected_images):
+        assert len(collected_images["recursive"]) > 0
+
+    def test_finds_all_formats(self, collected_images):
+        files = collected_images["recursive"]
+        extensions = {os.path.splitext(f)[1].lower() for f in files}
         # Should find at least jpg, png, gif, webp from test photos
         assert ".jpg" in extensions
         assert ".png" in extensions
         assert ".gif" in extensions
 
-    def test_sorted_alphabetically(self):
-        if not TEST_PHOTOS.exists():
-            pytest.skip("test_photos not found")
-        files = collect_image_files(TEST_PHOTOS)
+    def test_sorted_alphabetically(self, collected_images):
+        files = collected_images["recursive"]
         assert files == sorted(files)
 
-    def test_non_recursive(self):
-        if not TEST_PHOTOS.exists():
-            pytest.skip("test_photos not found")
-        files_recursive = collect_image_files(TEST_PHOTOS, recursive=True)
-        files_flat = collect_image_files(TEST_PHOTOS, recursive=False)
+    def test_non_recursive(self, collected_images):
         # Non-recursive should find fewer or equal (test_photos has subdirs)
-        assert len(files_flat) <= len(files_recursive)
+        assert len(collected_images["flat"]) <= len(collected_images["recursive"])
+
+
+class _FakeImage:
+    """The bits of QImage that ImageCache reads."""
+
+    __slots__ = ("_size",)
+
+    def __init__(self, size: int):
+        self._size = size
+
+    def sizeInBytes(self) -> int:
+        return self._size
+
+    def isNull(self) -> bool:
+        return False
+
+
+class _FakePixmap:
+    """A QPixmap stand-in; real ones need a QApplication."""
+
+    __slots__ = ("_image",)
+
+    def __init__(self, size: int):
+        self._image = _FakeImage(size)
+
+    def toImage(self) -> _FakeImage:
+        return self._image
+
+
+@pytest.fixture
+def image_cache() -> ImageCache:
+    return ImageCache(max_size_mb=100)
 
 
 class TestImageCache:
     """Test the LRU image cache (no QApplication needed for basic logic)."""
 
-    def test_put_and_get(self):
+    def test_put_and_get(self, image_cache):
         # We can't create real QPixmaps without QApplication,
-        # but we can test the cache logic with mocks
-        cache = ImageCache(max_size_mb=100)
-        # Mock a pixmap with known size
-        mock_pm = MagicMock()
-        mock_img = MagicMock()
-        mock_img.sizeInBytes.return_value = 1024
-        mock_img.isNull.return_value = False
-        mock_pm.toImage.return_value = mock_img
-
-        cache.put(0, mock_pm)
-        assert 0 in cache
-        assert cache.get(0) is mock_pm
-
-    def test_cache_miss(self):
-        cache = ImageCache(max_size_mb=100)
-        assert cache.get(99) is None
-        assert 99 not in cache
-
-    def test_clear(self):
-        cache = ImageCache(max_size_mb=100)
-        mock_pm = MagicMock()
-        mock_img = MagicMock()
-        mock_img.sizeInBytes.return_value = 1024
-        mock_img.isNull.return_value = False
-        mock_pm.toImage.return_value = mock_img
-
-        cache.put(0, mock_pm)
-        cache.clear()
-        assert 0 not in cache
+        # but we can test the cache logic with a stand-in of known size
+        pixmap = _FakePixmap(1024)
+
+        image_cache.put(0, pixmap)
+        assert 0 in image_cache
+        assert image_cache.get(0) is pixmap
+
+    def test_cache_miss(self, image_cache):
+        assert image_cache.get(99) is None
+        assert 99 not in image_cache
+
+    def test_clear(self, image_cache):
+        image_cache.put(0, _FakePixmap(1024))
+        image_cache.clear()
+        assert 0 not in image_cache
+
+
+class _FakeKeyEvent:
+    """The bits of QKeyEvent that KeyHandler reads."""
+
+    __slots__ = ("_key", "_modifiers")
+
+    def __init__(self, key, modifiers):
+        self._key = key
+        self._modifiers = modifiers
+
+    def key(self):
+        return self._key
+
+    def modifiers(self):
+        return self._modifiers
+
+
+@pytest.fixture
+def key_handler() -> tuple[KeyHandler, list[Action]]:
+    """A KeyHandler and the list its triggered actions are appended to."""
+    handler = KeyHandler()
+    actions: list[Action] = []
+    handler.action_triggered.connect(actions.append)
+    return handler, actions
 
 
 class TestKeyHandler:
     """Test key handler action mapping (no QApplication needed)."""
 
-    def _make_key_event(self, key, modifiers=None):
-        """Create a mock QKeyEvent."""
-        from unittest.mock import MagicMock
-        from PyQt6.QtCore import Qt
-        event = MagicMock()
-        event.key.return_value = key
+    @pytest.mark.parametrize("key, modifiers, expected", [
+        pytest.param(Qt.Key.Key_Right, None, Action.NEXT_IMAGE, id="right_next"),
+        pytest.param(Qt.Key.Key_Left, None, Action.PREV_IMAGE, id="left_prev"),
+        pytest.param(
+            Qt.Key.Key_Right, Qt.KeyboardModifier.ShiftModifier,
+            Action.NEXT_FOLDER, id="shift_right_folder",
+        ),
+        pytest.param(Qt.Key.Key_Escape, None, Action.QUIT, id="escape_quit"),
+        pytest.param(
+            Qt.Key.Key_R, Qt.KeyboardModifier.ControlModifier,
+            Action.RESET_IMAGE, id="ctrl_r_reset",
+        ),
+        pytest.param(
+            Qt.Key.Key_F11, None, Action.TOGGLE_FULLSCREEN, id="f11_fullscreen",
+        ),
+        pytest.param(
+            Qt.Key.Key_M, Qt.KeyboardModifier.AltModifier,
+            Action.TOGGLE_HELP, id="alt_m_help",
+        ),
+        pytest.param(Qt.Key.Key_Tab, None, Action.CYCLE_ZOOM_MODE, id="tab_zoom"),
+        pytest.param(
+            Qt.Key.Key_Space, None, Action.TOGGLE_SLIDESHOW_PAUSE,
+            id="space_slideshow",
+        ),
+        pytest.param(Qt.Key.Key_A, None, None, id="unmapped_a"),
+    ])
+    def test_key_mapping(self, key_handler, key, modifiers, expected):
+        handler, actions = key_handler
         if modifiers is None:
             modifiers = Qt.KeyboardModifier(0)
-        event.modifiers.return_value = modifiers
-        return event
-
-    def test_right_arrow_next(self):
-        from PyQt6.QtCore import Qt
-        handler = KeyHandler()
-        actions: list[Action] = []
-        handler.action_triggered.connect(actions.append)
-
-        event = self._make_key_event(Qt.Key.Key_Right)
-        result = handler.handle_key_event(event)
-        assert result is True
-        assert actions == [Action.NEXT_IMAGE]
-
-    def test_left_arrow_prev(self):
-        from PyQt6.QtCore import Qt
-        handler = KeyHandler()
-        actions: list[Action] = []
-        handler.action_triggered.connect(actions.append)
-
-        event = self._make_key_event(Qt.Key.Key_Left)
-        handler.handle_key_event(event)
-        assert actions == [Action.PREV_IMAGE]
-
-    def test_shift_right_next_folder(self):
-        from PyQt6.QtCore import Qt
-        handler = KeyHandler()
-        actions: list[Action] = []
-        handler.action_triggered.connect(actions.append)
-
-        event = self._make_key_event(
-            Qt.Key.Key_Right, Qt.KeyboardModifier.ShiftModifier
-        )
-        handler.handle_key_event(event)
-        assert actions == [Action.NEXT_FOLDER]
-
-    def test_escape_quit(self):
-        from PyQt6.QtCore import Qt
-        handler = KeyHandler()
-        actions: list[Action] = []
-        handler.action_triggered.connect(actions.append)
-
-        event = self._make_key_event(Qt.Key.Key_Escape)
-        handler.handle_key_event(event)
-        assert actions == [Action.QUIT]
-
-    def test_ctrl_r_reset(self):
-        from PyQt6.QtCore import Qt
-        handler = KeyHandler()
-        actions: list[Action] = []
-        handler.action_triggered.connect(actions.append)
-
-        event = self._make_key_event(
-            Qt.Key.Key_R, Qt.KeyboardModifier.ControlModifier
-        )
-        handler.handle_key_event(event)
-        assert actions == [Action.RESET_IMAGE]
-
-    def test_f11_fullscreen(self):
-        from PyQt6.QtCore import Qt
-        handler = KeyHandler()
-        actions: list[Action] = []
-        handler.action_triggered.connect(actions.append)
-
-        event = self._make_key_event(Qt.Key.Key_F11)
-        handler.handle_key_event(event)
-        assert actions == [Action.TOGGLE_FULLSCREEN]
-
-    def test_unmapped_key_returns_false(self):
-        from PyQt6.QtCore import Qt
-        handler = KeyHandler()
-        event = self._make_key_event(Qt.Key.Key_A)
-        result = handler.handle_key_event(event)
-        assert result is False
-
-    def test_alt_m_help(self):
-        from PyQt6.QtCore import Qt
-        handler = KeyHandler()
-        actions: list[Action] = []
-        handler.action_triggered.connect(actions.append)
-
-        event = self._make_key_event(
-            Qt.Key.Key_M, Qt.KeyboardModifier.AltModifier
-        )
-        handler.handle_key_event(event)
-        assert actions == [Action.TOGGLE_HELP]
-
-    def test_tab_cycle_zoom(self):
-        from PyQt6.QtCore import Qt
-        handler = KeyHandler()
-        actions: list[Action] = []
-        handler.action_triggered.connect(actions.append)
-
-        event = self._make_key_event(Qt.Key.Key_Tab)
-        handler.handle_key_event(event)
-        assert actions == [Action.CYCLE_ZOOM_MODE]
-
-    def test_space_slideshow(self):
-        from PyQt6.QtCore import Qt
-        handler = KeyHandler()
-        actions: list[Action] = []
-        handler.action_triggered.connect(actions.append)
-
-        event = self._make_key_event(Qt.Key.Key_Space)
-        handler.handle_key_event(event)
-        assert actions == [Action.TOGGLE_SLIDESHOW_PAUSE]
+        result = handler.handle_key_event(_FakeKeyEvent(key, modifiers))
+        assert result is (expected is not None)
+        assert actions == ([] if expected is None else [expected])
+
+
+@pytest.fixture(scope="module")
+def parser():
+    """One CLI parser for all tests; parse_args doesn't change it."""
+    return build_parser()
 
 
 class TestAppArgParser:
     """Test CLI argument parsing."""
 
-    def test_basic_path(self):
-        from photo_manager.viewer.app import build_parser
-        parser = build_parser()
-        args = parser.parse_args(["test_photos/"])
-        assert args.path == "test_photos/"
-        assert args.slideshow is False
-        assert args.query is None
-
-    def test_slideshow_flag(self):
-        from photo_manager.viewer.app import build_parser
-        parser = build_parser()
-        args = parser.parse_args(["test_photos/", "--slideshow"])
-        assert args.slideshow is True
-
-    def test_query_with_value(self):
-        from photo_manager.viewer.app import build_parser
-        parser = build_parser()
-        args = parser.parse_args(["test.db", "--query", 'tag.person=="Alice"'])
-        assert args.query == 'tag.person=="Alice"'
-
-    def test_query_without_value(self):
-        from photo_manager.viewer.app import build_parser
-        parser = build_parser()
-        args = parser.parse_args(["test.db", "--query"])
-        assert args.query == ""  # empty string means "open dialog"
-
-    def test_query_not_provided(self):
-        from photo_manager.viewer.app import build_parser
-        parser = build_parser()
-        args = parser.parse_args(["test.db"])
-        assert args.query is None  # None means "all images"
-
-    def test_fullscreen_flags(self):
-        from photo_manager.viewer.app import build_parser
-        parser = build_parser()
-        args = parser.parse_args(["photos/", "--fullscreen"])
-        assert args.fullscreen is True
-
-        args = parser.parse_args(["photos/", "--windowed"])
-        assert args.windowed is True
+    @pytest.mark.parametrize("argv, attr, expected", [
+        pytest.param(["test_photos/"], "path", "test_photos/", id="path"),
+        pytest.param(
+            ["test_photos/"], "slideshow", False, id="slideshow_default",
+        ),
+        pytest.param(
+            ["test_photos/", "--slideshow"], "slideshow", True, id="slideshow_flag",
+        ),
+        pytest.param(
+            ["test.db", "--query", 'tag.person=="Alice"'], "query",
+            'tag.person=="Alice"', id="query_value",
+        ),
+        # Empty string means "open dialog"; None means "all images"
+        pytest.param(["test.db", "--query"], "query", "", id="query_no_value"),
+        pytest.param(["test.db"], "query", None, id="query_absent"),
+        pytest.param(
+            ["photos/", "--fullscreen"], "fullscreen", True, id="fullscreen",
+        ),
+        pytest.param(["photos/", "--windowed"], "windowed", True, id="windowed"),
+    ])
+    def test_parse_args(self, parser, argv, attr, expected):
+        value = getattr(parser.parse_args(argv), attr)
+        # Type too, so False/None aren't satisfied by 0 or ""
+        assert value == expected and type(value) is type(expected)